@@ -3,10 +3,15 @@ CREATE TABLE IF NOT EXISTS recipes (
     id SERIAL PRIMARY KEY,
     recipe_name VARCHAR(500) UNIQUE NOT NULL,
     markdown_doc TEXT NOT NULL,
+    content_hash VARCHAR(64),  -- SHA-256 of markdown_doc, used to skip unchanged recipes on re-ingest
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Upgrade databases created by an earlier version of this schema
+-- (00-init-database.sh re-applies this file to existing containers)
+ALTER TABLE recipes ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+
 -- Index for recipe name lookups
 CREATE INDEX IF NOT EXISTS idx_recipes_name ON recipes(recipe_name);
 
@@ -20,16 +25,22 @@ CREATE TABLE IF NOT EXISTS recipe_metadata (
     tags TEXT[],  -- Array of tags for filtering
     is_composite BOOLEAN DEFAULT FALSE,
     recipe_count INTEGER DEFAULT 0,  -- Number of sub-recipes
+    options JSONB DEFAULT '[]'::jsonb,  -- Option schemas: [{name, type, required, example, ...}]
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+ALTER TABLE recipe_metadata ADD COLUMN IF NOT EXISTS options JSONB DEFAULT '[]'::jsonb;
+
 -- Index for recipe_id lookups
 CREATE INDEX IF NOT EXISTS idx_recipe_metadata_recipe_id ON recipe_metadata(recipe_id);
 
 -- Index for tag searches using GIN (Generalized Inverted Index)
 CREATE INDEX IF NOT EXISTS idx_recipe_metadata_tags ON recipe_metadata USING GIN(tags);
 
+-- Index for option containment filters (e.g. options @> '[{"name": "newVersion"}]')
+CREATE INDEX IF NOT EXISTS idx_recipe_metadata_options ON recipe_metadata USING GIN(options jsonb_path_ops);
+
 -- Table for embeddings (Phase 3)
 -- Dimension: 384 for sentence-transformers (development), 1024 for Voyage AI (production)
 CREATE TABLE IF NOT EXISTS recipe_embeddings (
@@ -37,18 +48,50 @@ CREATE TABLE IF NOT EXISTS recipe_embeddings (
     recipe_id INTEGER REFERENCES recipes(id) ON DELETE CASCADE,
     embedding vector(384),  -- Change to vector(1024) when using Voyage AI
     embedding_model VARCHAR(200),
+    embedding_text_hash VARCHAR(64),  -- SHA-256 of the embedded text, used to skip re-encoding unchanged recipes
     created_at TIMESTAMP DEFAULT NOW(),
     UNIQUE(recipe_id, embedding_model)  -- Allow multiple embeddings per recipe (different models)
 );
 
+ALTER TABLE recipe_embeddings ADD COLUMN IF NOT EXISTS embedding_text_hash VARCHAR(64);
+
 -- Index for recipe_id lookups
 CREATE INDEX IF NOT EXISTS idx_recipe_embeddings_recipe_id ON recipe_embeddings(recipe_id);
 
--- Index for vector similarity search (Phase 3)
--- Using HNSW (Hierarchical Navigable Small World) for better performance than IVFFlat
--- Parameters:
---   m = 16: Number of connections per node (higher = better recall, larger index)
---   ef_construction = 64: Build-time search breadth (higher = better quality, slower build)
-CREATE INDEX IF NOT EXISTS idx_recipe_embeddings_vector
-ON recipe_embeddings USING hnsw (embedding vector_cosine_ops)
-WITH (m = 16, ef_construction = 64);
+-- Index for vector similarity search (Phase 3): idx_recipe_embeddings_vector
+-- Using HNSW (Hierarchical Navigable Small World) for better performance than IVFFlat.
+-- It is not created here: ingest_pipeline.py loads embeddings without it and then
+-- builds it once with parallel maintenance workers, using HNSW_M (connections per
+-- node, default 16) and HNSW_EF_CONSTRUCTION (build-time search breadth, default 64).
+-- With VECTOR_QUANTIZATION=halfvec or binary it indexes embedding::halfvec(384) or
+-- binary_quantize(embedding)::bit(384) instead; the column keeps the full vectors.
+
+-- Optional low-dimensional companion of the embedding (REDUCED_DIMENSION > 0), used
+-- as a cheap first search stage before re-ranking with the full vectors. The column
+-- has no fixed dimension; 03b-generate-embeddings.py fills it with the projection
+-- stored in embedding_projections and indexes embedding_reduced::vector(<dimension>)
+-- as idx_recipe_embeddings_reduced.
+ALTER TABLE recipe_embeddings ADD COLUMN IF NOT EXISTS embedding_reduced vector;
+
+-- Table for precomputed related recipes (nearest neighbors in embedding space)
+-- Filled by 03b-generate-embeddings.py with one all-pairs pass over recipe_embeddings
+CREATE TABLE IF NOT EXISTS recipe_neighbors (
+    recipe_id INTEGER REFERENCES recipes(id) ON DELETE CASCADE,
+    neighbor_id INTEGER REFERENCES recipes(id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,  -- 1 = most similar
+    similarity REAL NOT NULL,
+    PRIMARY KEY (recipe_id, rank)
+);
+
+-- Projection from embeddings to embedding_reduced, one per embedding model
+-- reduced = (embedding - mean) x components^T; the MCP server applies the same
+-- transform to query embeddings
+CREATE TABLE IF NOT EXISTS embedding_projections (
+    embedding_model VARCHAR(200) PRIMARY KEY,
+    method VARCHAR(20) NOT NULL,  -- 'pca' (fitted) or 'truncate' (Matryoshka prefix)
+    dimension INTEGER NOT NULL,
+    mean REAL[] NOT NULL,  -- EMBEDDING_DIMENSION values
+    components REAL[] NOT NULL,  -- dimension x EMBEDDING_DIMENSION, row-major
+    explained_variance REAL,  -- share of the embedding variance kept (pca only)
+    created_at TIMESTAMP DEFAULT NOW()
+);
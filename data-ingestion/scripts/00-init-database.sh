@@ -47,8 +47,11 @@ log_success "Schema files found"
 cd "$PROJECT_DIR"
 
 # Check if the container exists and remove it if RESET_DB is true
+CONTAINER_EXISTED=false
 if docker ps -a --filter "name=${POSTGRES_CONTAINER_NAME}" --format "{{.Names}}" | grep -q "${POSTGRES_CONTAINER_NAME}"; then
+    CONTAINER_EXISTED=true
     if [ "$RESET_DB" = true ]; then
+        CONTAINER_EXISTED=false
         log_info "Removing existing '${POSTGRES_CONTAINER_NAME}' container..."
         if docker rm -f "${POSTGRES_CONTAINER_NAME}"; then
             log_success "Existing '${POSTGRES_CONTAINER_NAME}' container removed."
@@ -87,6 +90,21 @@ while [ $RETRY_COUNT -lt $MAX_RETRIES ]; do
     sleep 1
 done
 
+# Schema files only run automatically on a fresh container; re-apply them
+# (they are idempotent) so existing databases pick up schema upgrades
+if [ "$CONTAINER_EXISTED" = true ]; then
+    log_info "Applying schema to existing database..."
+    for schema_file in "$SCHEMA_DIR"/*.sql; do
+        if docker-compose exec -T postgres psql -v ON_ERROR_STOP=1 -q -U "$DB_USER" -d "$DB_NAME" \
+            -f "/docker-entrypoint-initdb.d/$(basename "$schema_file")" >/dev/null; then
+            log_success "Applied $(basename "$schema_file")"
+        else
+            log_error "Failed to apply $(basename "$schema_file")"
+            exit 1
+        fi
+    done
+fi
+
 # Verify schema was applied
 log_info "Verifying schema..."
 RECIPE_TABLE_EXISTS=$(docker-compose exec -T postgres psql -U "$DB_USER" -d "$DB_NAME" -tAc \
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Script: 03c-swap-schema.py
+Purpose: Build a new data version in a shadow schema and swap it live atomically
+
+Ingestion into the live tables lets a running MCP server observe half-ingested
+state. Instead, a new version is built next to the live one:
+
+    03c-swap-schema.py prepare     # create SHADOW_SCHEMA (seeded from live data)
+    DB_SCHEMA=recipes_shadow 03-ingest-docs.py
+    DB_SCHEMA=recipes_shadow 03b-generate-embeddings.py
+    03c-swap-schema.py swap        # shadow -> public, public -> PREVIOUS_SCHEMA
+    03c-swap-schema.py rollback    # swap public and PREVIOUS_SCHEMA back
+
+The swap moves the tables (with their indexes and sequences) between schemas
+with ALTER TABLE ... SET SCHEMA in a single transaction, so readers see either
+the old or the new version. The server queries unqualified table names through
+the default search path and needs no change.
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import asyncpg
+
+# Import common utilities
+from common import ScriptConfig, Logger, get_db_connection, test_db_connection
+
+# Initialize configuration
+config = ScriptConfig()
+logger = Logger(verbose=config.VERBOSE)
+
+# Schema definition applied to the shadow schema
+SCHEMA_FILE = config.PROJECT_DIR / 'db-init' / '02-create-schema.sql'
+
+# Tables making up one data version, in foreign key order
+VERSIONED_TABLES = (
+    'recipes', 'recipe_metadata', 'recipe_embeddings', 'recipe_neighbors', 'embedding_projections'
+)
+
+# Tables with a SERIAL id whose sequence must follow copied rows
+SERIAL_TABLES = ('recipes', 'recipe_metadata', 'recipe_embeddings')
+
+_IDENTIFIER = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+def validate_schema_name(schema: str) -> str:
+    """
+    Check that a configured schema name is a plain identifier.
+
+    Raises:
+        ValueError: If the name needs quoting (and could inject SQL)
+    """
+    if not _IDENTIFIER.match(schema):
+        raise ValueError(f"Invalid schema name: {schema!r}")
+    return schema
+
+
+async def table_columns(conn: asyncpg.Connection, schema: str, table: str) -> List[str]:
+    """Get the column names of a table in definition order."""
+    rows = await conn.fetch("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = $1 AND table_name = $2
+        ORDER BY ordinal_position
+    """, schema, table)
+    return [r['column_name'] for r in rows]
+
+
+async def existing_tables(conn: asyncpg.Connection, schema: str) -> List[str]:
+    """Get the versioned tables present in a schema."""
+    rows = await conn.fetch("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_schema = $1 AND table_name = ANY($2::text[])
+    """, schema, list(VERSIONED_TABLES))
+    present = {r['table_name'] for r in rows}
+    return [table for table in VERSIONED_TABLES if table in present]
+
+
+async def schema_version(conn: asyncpg.Connection, schema: str) -> Dict:
+    """Describe the data version held in a schema (build label and row counts)."""
+    tables = await existing_tables(conn, schema)
+    if 'recipes' not in tables:
+        return {}
+    label = await conn.fetchval("SELECT obj_description($1::regclass, 'pg_class')", f'{schema}.recipes')
+    counts = {
+        table: await conn.fetchval(f"SELECT COUNT(*) FROM {schema}.{table}")
+        for table in tables
+    }
+    return {'label': label or 'unlabeled', 'counts': counts}
+
+
+async def move_tables(conn: asyncpg.Connection, source: str, target: str):
+    """Move all versioned tables from one schema to another."""
+    for table in await existing_tables(conn, source):
+        await conn.execute(f"ALTER TABLE {source}.{table} SET SCHEMA {target}")
+
+
+async def prepare_shadow(conn: asyncpg.Connection, shadow: str, seed: bool):
+    """
+    Create the shadow schema with empty tables, optionally seeded with live data.
+
+    Seeding keeps recipe ids and content hashes, so the following ingestion
+    only rewrites what changed.
+    """
+    schema_sql = SCHEMA_FILE.read_text(encoding='utf-8')
+    build_label = f"build {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}"
+
+    async with conn.transaction():
+        await conn.execute(f"DROP SCHEMA IF EXISTS {shadow} CASCADE")
+        await conn.execute(f"CREATE SCHEMA {shadow}")
+        await conn.execute(f"SET LOCAL search_path TO {shadow}, public")
+        await conn.execute(schema_sql)
+        await conn.execute(f"COMMENT ON TABLE {shadow}.recipes IS '{build_label}'")
+
+        if seed:
+            for table in await existing_tables(conn, 'public'):
+                live_columns = set(await table_columns(conn, 'public', table))
+                columns = ', '.join(
+                    c for c in await table_columns(conn, shadow, table) if c in live_columns
+                )
+                status = await conn.execute(
+                    f"INSERT INTO {shadow}.{table} ({columns}) SELECT {columns} FROM public.{table}"
+                )
+                logger.log(f"  Seeded {table}: {status.split()[-1]} rows", force=True)
+
+            for table in SERIAL_TABLES:
+                await conn.execute(f"""
+                    SELECT setval(
+                        pg_get_serial_sequence('{shadow}.{table}', 'id'),
+                        COALESCE(MAX(id), 1),
+                        MAX(id) IS NOT NULL
+                    ) FROM {shadow}.{table}
+                """)
+
+    logger.log(f"✓ Shadow schema '{shadow}' ready ({build_label})", force=True)
+
+
+async def swap_shadow(conn: asyncpg.Connection, shadow: str, previous: str, force: bool):
+    """Make the shadow version live and keep the replaced version in the previous schema."""
+    version = await schema_version(conn, shadow)
+    if not version:
+        logger.log(f"✗ Error: Shadow schema '{shadow}' has no recipes table. Run 'prepare' first.", force=True)
+        sys.exit(1)
+    if len(await existing_tables(conn, shadow)) != len(VERSIONED_TABLES):
+        logger.log(f"✗ Error: Shadow schema '{shadow}' is incomplete", force=True)
+        sys.exit(1)
+    if not version['counts']['recipes'] and not force:
+        logger.log(f"✗ Error: Shadow schema '{shadow}' has no recipes (use --force to swap anyway)", force=True)
+        sys.exit(1)
+
+    async with conn.transaction():
+        await conn.execute(f"DROP SCHEMA IF EXISTS {previous} CASCADE")
+        await conn.execute(f"CREATE SCHEMA {previous}")
+        await move_tables(conn, 'public', previous)
+        await move_tables(conn, shadow, 'public')
+        # Leftovers (e.g. an aborted staging table) are not part of the version
+        await conn.execute(f"DROP SCHEMA {shadow} CASCADE")
+
+    logger.log(f"✓ Swapped '{shadow}' live ({version['label']}, {version['counts']['recipes']} recipes)", force=True)
+    logger.log(f"  Previous version kept in '{previous}' (run 'rollback' to restore it)", force=True)
+
+
+async def rollback(conn: asyncpg.Connection, previous: str):
+    """Swap the live and the previous version; running it again undoes the rollback."""
+    version = await schema_version(conn, previous)
+    if not version or len(await existing_tables(conn, previous)) != len(VERSIONED_TABLES):
+        logger.log(f"✗ Error: No complete previous version in '{previous}'", force=True)
+        sys.exit(1)
+
+    swap_schema = f"{previous}_swap"
+    async with conn.transaction():
+        await conn.execute(f"DROP SCHEMA IF EXISTS {swap_schema} CASCADE")
+        await conn.execute(f"CREATE SCHEMA {swap_schema}")
+        await move_tables(conn, 'public', swap_schema)
+        await move_tables(conn, previous, 'public')
+        await conn.execute(f"DROP SCHEMA {previous} CASCADE")
+        await conn.execute(f"ALTER SCHEMA {swap_schema} RENAME TO {previous}")
+
+    logger.log(f"✓ Restored previous version ({version['label']}, {version['counts']['recipes']} recipes)", force=True)
+    logger.log(f"  Replaced version kept in '{previous}'", force=True)
+
+
+async def print_status(conn: asyncpg.Connection, shadow: str, previous: str):
+    """Print the data version held in each schema."""
+    for role, schema in (('live', 'public'), ('shadow', shadow), ('previous', previous)):
+        version = await schema_version(conn, schema)
+        if not version:
+            logger.log(f"  {role:<8} ({schema}): -", force=True)
+            continue
+        counts = ', '.join(f"{table}={count}" for table, count in version['counts'].items())
+        logger.log(f"  {role:<8} ({schema}): {version['label']} [{counts}]", force=True)
+
+
+async def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Build into a shadow schema and swap it live")
+    parser.add_argument('command', choices=['prepare', 'swap', 'rollback', 'status'])
+    parser.add_argument('--empty', action='store_true',
+                        help="prepare: start from empty tables instead of a copy of the live data")
+    parser.add_argument('--force', action='store_true',
+                        help="swap: allow swapping in a version without recipes")
+    args = parser.parse_args()
+
+    shadow = validate_schema_name(config.SHADOW_SCHEMA)
+    previous = validate_schema_name(config.PREVIOUS_SCHEMA)
+
+    logger.print_stage_header(f"Stage 3c: Shadow Schema ({args.command})")
+
+    if not await test_db_connection(config, logger):
+        logger.log(f"  Run 00-init-database.sh first to initialize the database.", force=True)
+        sys.exit(1)
+
+    conn = await get_db_connection(config, schema='public')
+    try:
+        if args.command == 'prepare':
+            await prepare_shadow(conn, shadow, seed=not args.empty)
+        elif args.command == 'swap':
+            await swap_shadow(conn, shadow, previous, args.force)
+        elif args.command == 'rollback':
+            await rollback(conn, previous)
+
+        logger.log("", force=True)
+        logger.log("Data versions:", force=True)
+        await print_status(conn, shadow, previous)
+    finally:
+        await conn.close()
+
+    logger.print_stage_footer("3c")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
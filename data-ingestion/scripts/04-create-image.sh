@@ -65,6 +65,8 @@ log_info "Exporting database to SQL dump..."
 if docker exec "$POSTGRES_CONTAINER_NAME" \
     pg_dump -U "$DB_USER" -d "$DB_NAME" \
     --no-owner --no-privileges \
+    --exclude-schema="${SHADOW_SCHEMA:-recipes_shadow}" \
+    --exclude-schema="${PREVIOUS_SCHEMA:-recipes_previous}" \
     > "$BUILD_DIR/recipes-dump.sql"; then
     DUMP_SIZE=$(du -h "$BUILD_DIR/recipes-dump.sql" | cut -f1)
     log_success "Database exported ($DUMP_SIZE)"
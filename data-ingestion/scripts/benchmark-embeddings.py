@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Script: benchmark-embeddings.py
+Purpose: Measure embedding throughput of the encode strategies used by stage 3b
+
+Encodes the same recipes from recipe-metadata.json with:
+    per-recipe     one model.encode() call per recipe (the former 03b loop)
+    batched        batches of EMBED_BATCH_SIZE in metadata order
+    length-sorted  batches of EMBED_BATCH_SIZE sorted by token length (03b)
+    multi-process  length-sorted batches spread over EMBED_WORKERS processes
+                   (only when EMBED_WORKERS > 1)
+
+and reports recipes/s per strategy. Nothing is written to the database.
+
+Usage:
+    ./benchmark-embeddings.py [--limit N] [--batch-size N]
+"""
+
+import argparse
+import sys
+import time
+from functools import partial
+from itertools import islice
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from ingest_pipeline import (
+    METADATA_FILE, config, create_embedding_text, create_encoder_pool, encode_batch,
+    encode_batch_in_worker, iter_metadata, length_sorted_batches, load_embedding_model,
+    logger, token_lengths
+)
+
+
+def encode_per_recipe(model, texts: List[str], batch_size: int) -> np.ndarray:
+    """Encode one text per model call."""
+    return np.vstack([encode_batch(model, [text]) for text in texts])
+
+
+def encode_batched(model, texts: List[str], batch_size: int) -> np.ndarray:
+    """Encode fixed-size batches in input order."""
+    return np.vstack([
+        encode_batch(model, texts[i:i + batch_size])
+        for i in range(0, len(texts), batch_size)
+    ])
+
+
+def encode_length_sorted(model, texts: List[str], batch_size: int) -> np.ndarray:
+    """Encode batches of similar token length and scatter vectors back to input order."""
+    vectors = np.empty((len(texts), config.EMBEDDING_DIMENSION), dtype=np.float32)
+    for positions in length_sorted_batches(token_lengths(model, texts), batch_size):
+        vectors[positions] = encode_batch(model, [texts[i] for i in positions])
+    return vectors
+
+
+def encode_multi_process(pool, model, texts: List[str], batch_size: int) -> np.ndarray:
+    """Encode length-sorted batches in the encoder pool; map() keeps batch order."""
+    vectors = np.empty((len(texts), config.EMBEDDING_DIMENSION), dtype=np.float32)
+    batches = length_sorted_batches(token_lengths(model, texts), batch_size)
+    results = pool.map(encode_batch_in_worker, [[texts[i] for i in positions] for positions in batches])
+    for positions, batch_vectors in zip(batches, results):
+        vectors[positions] = batch_vectors
+    return vectors
+
+
+STRATEGIES: Dict[str, Callable] = {
+    'per-recipe': encode_per_recipe,
+    'batched': encode_batched,
+    'length-sorted': encode_length_sorted,
+}
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Benchmark recipe embedding strategies")
+    parser.add_argument('--limit', type=int, default=1000,
+                        help="number of recipes to encode (0 = all, default: 1000)")
+    parser.add_argument('--batch-size', type=int, default=config.EMBED_BATCH_SIZE,
+                        help=f"batch size (default: EMBED_BATCH_SIZE={config.EMBED_BATCH_SIZE})")
+    args = parser.parse_args()
+
+    logger.print_stage_header("Embedding Benchmark")
+
+    named = (m for m in iter_metadata() if m.get('name'))
+    texts = [create_embedding_text(m) for m in islice(named, args.limit or None)]
+    if not texts:
+        logger.log(f"✗ Error: No recipes in {METADATA_FILE}", force=True)
+        logger.log(f"  Run 02b-generate-structured-data.sh first", force=True)
+        sys.exit(1)
+
+    model = load_embedding_model()
+    # Warm up so model initialization is not billed to the first strategy
+    encode_batch(model, texts[:args.batch_size])
+
+    strategies = dict(STRATEGIES)
+    pool = create_encoder_pool()
+    if pool is not None:
+        strategies['multi-process'] = partial(encode_multi_process, pool)
+
+    logger.log(f"→ Encoding {len(texts)} recipes (batch size {args.batch_size})...", force=True)
+    results = {}
+    try:
+        for name, strategy in strategies.items():
+            start = time.perf_counter()
+            vectors = strategy(model, texts, args.batch_size)
+            results[name] = (time.perf_counter() - start, vectors)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    baseline_seconds, baseline_vectors = results['per-recipe']
+    logger.log("", force=True)
+    logger.log("========================================", force=True)
+    logger.log("Summary", force=True)
+    logger.log("========================================", force=True)
+    for name, (seconds, vectors) in results.items():
+        deviation = float(np.abs(vectors - baseline_vectors).max())
+        logger.log(
+            f"  {name:<14} {len(texts) / seconds:8.1f} recipes/s  "
+            f"({seconds:.2f}s, {baseline_seconds / seconds:.1f}x, max deviation {deviation:.1e})",
+            force=True
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -39,6 +39,12 @@ class ScriptConfig:
         self.DB_PASSWORD = os.environ['DB_PASSWORD']
         self.POSTGRES_CONTAINER_NAME = os.environ['POSTGRES_CONTAINER_NAME']
 
+        # Schema the ingestion scripts write to ('public' = live tables).
+        # Set to SHADOW_SCHEMA to build a new version next to the live one.
+        self.DB_SCHEMA = os.environ.get('DB_SCHEMA') or 'public'
+        self.SHADOW_SCHEMA = os.environ.get('SHADOW_SCHEMA') or 'recipes_shadow'
+        self.PREVIOUS_SCHEMA = os.environ.get('PREVIOUS_SCHEMA') or 'recipes_previous'
+
         # Generator configuration
         self.GENERATOR_WORKSPACE = os.environ['GENERATOR_WORKSPACE']
         self.GENERATOR_OUTPUT_DIR = os.environ['GENERATOR_OUTPUT_DIR']
@@ -46,9 +52,57 @@ class ScriptConfig:
         self.GENERATOR_DIR_FULL = Path(self.GENERATOR_WORKSPACE) / self.GENERATOR_DIR
 
         # Embedding configuration
-        self.EMBEDDING_MODEL = os.environ['EMBEDDING_MODEL']
+        # Key of stored embeddings and projections; the 'sentence-transformers/'
+        # hub prefix is dropped so the MCP server matches either spelling
+        self.EMBEDDING_MODEL = os.environ['EMBEDDING_MODEL'].removeprefix('sentence-transformers/')
         self.EMBEDDING_DIMENSION = int(os.environ['EMBEDDING_DIMENSION'])
 
+        # Markdown parsing configuration (03-ingest-docs.py)
+        self.PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS') or os.cpu_count() or 1)
+        self.PARSE_CHUNK_SIZE = int(os.environ.get('PARSE_CHUNK_SIZE', '64'))
+        self.PARSE_QUEUE_SIZE = int(os.environ.get('PARSE_QUEUE_SIZE', '1000'))
+
+        # Embedding batch size (recipes encoded per model call)
+        self.EMBED_BATCH_SIZE = int(os.environ.get('EMBED_BATCH_SIZE', '64'))
+
+        # Embedding worker processes, each with its own model copy (1 = encode in-process)
+        # and the torch threads each worker is pinned to (default: CPUs / workers)
+        self.EMBED_WORKERS = max(1, int(os.environ.get('EMBED_WORKERS') or 1))
+        self.EMBED_THREADS = int(
+            os.environ.get('EMBED_THREADS') or max(1, (os.cpu_count() or 1) // self.EMBED_WORKERS)
+        )
+
+        # Changed recipes sorted by token length before batching (0 = all at once)
+        self.EMBED_SORT_WINDOW = int(os.environ.get('EMBED_SORT_WINDOW', '2048'))
+
+        # On-disk embedding cache consulted before encoding (empty = disabled)
+        self.EMBEDDING_CACHE_PATH = os.environ.get('EMBEDDING_CACHE_PATH', '')
+
+        # Staging rows committed per batch (the most work a crash can lose)
+        self.CHECKPOINT_BATCH_SIZE = int(os.environ.get('CHECKPOINT_BATCH_SIZE', '500'))
+
+        # HNSW index on embeddings, built after bulk loads (ingest_pipeline.py).
+        # It is rebuilt instead of updated row by row when at least
+        # HNSW_REBUILD_FRACTION of the embeddings change.
+        self.HNSW_M = int(os.environ.get('HNSW_M', '16'))
+        self.HNSW_EF_CONSTRUCTION = int(os.environ.get('HNSW_EF_CONSTRUCTION', '64'))
+        self.HNSW_REBUILD_FRACTION = float(os.environ.get('HNSW_REBUILD_FRACTION', '0.1'))
+        self.INDEX_MAINTENANCE_WORK_MEM = os.environ.get('INDEX_MAINTENANCE_WORK_MEM') or '512MB'
+        self.INDEX_PARALLEL_WORKERS = int(
+            os.environ.get('INDEX_PARALLEL_WORKERS') or max(0, min((os.cpu_count() or 1) - 1, 7))
+        )
+        # Vectors held by the HNSW index: none (full precision), halfvec or
+        # binary; searches re-rank quantized candidates with the full vectors
+        self.VECTOR_QUANTIZATION = os.environ.get('VECTOR_QUANTIZATION') or 'none'
+
+        # Low-dimensional companion vectors for a cheap first search stage
+        # (0 = disabled); REDUCTION_METHOD is pca or truncate (Matryoshka models)
+        self.REDUCED_DIMENSION = int(os.environ.get('REDUCED_DIMENSION') or 0)
+        self.REDUCTION_METHOD = os.environ.get('REDUCTION_METHOD') or 'pca'
+
+        # Related recipes configuration
+        self.NEIGHBORS_TOP_N = int(os.environ.get('NEIGHBORS_TOP_N', '10'))
+
         # Logging
         self.VERBOSE = os.environ['VERBOSE'].lower() == 'true'
 
@@ -91,24 +145,34 @@ class Logger:
         self.log("", force=True)
 
 
-async def get_db_connection(config: ScriptConfig):
+async def get_db_connection(config: ScriptConfig, schema: Optional[str] = None):
     """
     Create database connection with standard configuration
 
+    Unqualified table names resolve to the given schema (default:
+    config.DB_SCHEMA); 'public' stays on the search path for pgvector types.
+
     Args:
         config: ScriptConfig instance with database settings
+        schema: Schema to read and write, overriding config.DB_SCHEMA
 
     Returns:
         asyncpg.Connection object
     """
     import asyncpg
 
+    schema = schema or config.DB_SCHEMA
+    server_settings = {}
+    if schema != 'public':
+        server_settings['search_path'] = f'{schema}, public'
+
     return await asyncpg.connect(
         host=config.DB_HOST,
         port=config.DB_PORT,
         database=config.DB_NAME,
         user=config.DB_USER,
-        password=config.DB_PASSWORD
+        password=config.DB_PASSWORD,
+        server_settings=server_settings
     )
 
 
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache of recipe embeddings
+
+Embeddings are stored in a local SQLite file keyed by
+sha256(model name + embedding text), so a rebuild against an empty database
+(e.g. in CI or after --reset) only encodes texts that were never encoded
+before. Vectors are kept as float16 to halve the file size.
+
+Usage:
+    from embedding_cache import open_embedding_cache
+
+    cache = open_embedding_cache(path, model_name, dimension, logger)
+    hits = cache.get_many(texts)          # position -> vector
+    cache.put_many(texts, vectors)
+"""
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Keys per SELECT (stays below SQLite's bound parameter limit)
+LOOKUP_CHUNK_SIZE = 500
+
+
+class EmbeddingCache:
+    """SQLite store of float16 embeddings keyed by model and text hash."""
+
+    def __init__(self, path: Path, model_name: str, dimension: int):
+        self.path = path
+        self.model_name = model_name
+        self.dimension = dimension
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Used from the pipeline's executor threads, one call at a time
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def make_key(self, text: str) -> str:
+        """Build the cache key of an embedding text for the configured model."""
+        return hashlib.sha256(f"{self.model_name}\n{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[int, np.ndarray]:
+        """
+        Look up cached embeddings.
+
+        Returns:
+            Dictionary of position in texts -> float32 vector, for hits only
+        """
+        positions: Dict[str, List[int]] = {}
+        for position, text in enumerate(texts):
+            positions.setdefault(self.make_key(text), []).append(position)
+
+        keys = list(positions)
+        hits = {}
+        for i in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[i:i + LOOKUP_CHUNK_SIZE]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            for key, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float16)
+                if vector.shape[0] != self.dimension:
+                    continue
+                for position in positions[key]:
+                    hits[position] = vector.astype(np.float32)
+        return hits
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Store embeddings of texts (one transaction)."""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [
+                    (self.make_key(text), np.asarray(vector, dtype=np.float16).tobytes())
+                    for text, vector in zip(texts, vectors)
+                ]
+            )
+
+    def count(self) -> int:
+        """Number of cached embeddings (all models)."""
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        self._conn.close()
+
+
+def open_embedding_cache(path: str, model_name: str, dimension: int, logger) -> Optional[EmbeddingCache]:
+    """
+    Open the embedding cache, or return None when disabled (empty path).
+
+    Cache failures are never fatal: if the file cannot be opened, embeddings
+    are computed without a cache. sqlite3.Error raised by get_many or
+    put_many later on makes the pipeline continue without the cache.
+    """
+    if not path:
+        return None
+    try:
+        cache = EmbeddingCache(Path(path), model_name, dimension)
+    except (sqlite3.Error, OSError) as e:
+        logger.log(f"⚠ Embedding cache disabled, cannot open {path}: {e}", force=True)
+        return None
+    logger.log(f"✓ Embedding cache: {path} ({cache.count()} vectors)", force=True)
+    return cache
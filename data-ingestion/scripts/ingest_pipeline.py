@@ -0,0 +1,1916 @@
+#!/usr/bin/env python3
+"""
+Streaming ingestion pipeline for recipe documentation, metadata and embeddings.
+
+Stages run concurrently and are connected by bounded queues, so memory stays
+bounded by the queue sizes rather than the corpus:
+
+    scan markdown files → parse (process pool) → COPY into recipes_staging
+                              ↓ recipe names
+    recipe-metadata.json → embed (batches, in a thread) → COPY into recipe_embeddings_staging
+
+Both staging tables are merged into recipes, recipe_metadata and
+recipe_embeddings in one transaction at the end, joined on recipe name.
+
+Modes:
+    docs        Stage 3 (03-ingest-docs.py): markdown → recipes
+    embeddings  Stage 3b (03b-generate-embeddings.py): metadata and embeddings
+                for recipes already in the database
+    all         Both in a single pass (default)
+
+Staging rows are committed in batches of CHECKPOINT_BATCH_SIZE and the
+staging tables are kept when a run fails, so they double as the progress
+checkpoint: --resume skips files and recipes already staged and only redoes
+the uncommitted tail.
+
+Usage:
+    ./ingest_pipeline.py [--mode all|docs|embeddings] [--resume]
+"""
+
+import argparse
+import asyncio
+import asyncpg
+import hashlib
+import json
+import multiprocessing
+import sys
+import re
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+# Import common utilities
+from common import ScriptConfig, Logger, get_db_connection, test_db_connection
+from embedding_cache import EmbeddingCache, open_embedding_cache
+
+# Initialize configuration
+config = ScriptConfig()
+logger = Logger(verbose=config.VERBOSE)
+
+# Get paths
+RECIPES_DIR = config.get_recipes_dir()
+METADATA_FILE = config.get_metadata_file()
+
+# Characters read from the metadata file at a time
+METADATA_READ_SIZE = 1 << 16
+
+# Unlogged tables parsed rows are copied into before the merge
+DOCS_STAGING_TABLE = 'recipes_staging'
+EMBEDDINGS_STAGING_TABLE = 'recipe_embeddings_staging'
+
+# Temporary table of staged embeddings resolved to recipe ids during the merge
+RESOLVED_EMBEDDINGS_TABLE = 'resolved_embeddings'
+
+# HNSW index on recipe_embeddings.embedding, built by the pipeline after bulk loads
+VECTOR_INDEX = 'idx_recipe_embeddings_vector'
+
+# Indexed expression and operator class of the HNSW index per VECTOR_QUANTIZATION;
+# quantized modes index a cast of the column, the table keeps the full vectors
+VECTOR_INDEX_KEYS = {
+    'none': ('embedding', 'vector_cosine_ops'),
+    'halfvec': ('(embedding::halfvec({dimension}))', 'halfvec_cosine_ops'),
+    'binary': ('(binary_quantize(embedding)::bit({dimension}))', 'bit_hamming_ops'),
+}
+
+# First pgvector release with halfvec and binary_quantize
+QUANTIZATION_MIN_PGVECTOR = (0, 7, 0)
+
+# HNSW index on the low-dimensional companion vectors (REDUCED_DIMENSION > 0)
+REDUCED_INDEX = 'idx_recipe_embeddings_reduced'
+
+# Temporary table reduced vectors are copied into before updating recipe_embeddings
+REDUCED_EMBEDDINGS_TABLE = 'reduced_embeddings'
+
+# Ways to derive the reduced vectors: fitted PCA or Matryoshka prefix truncation
+REDUCTION_METHODS = ('pca', 'truncate')
+
+# Unlogged table describing the run the staging tables belong to
+CHECKPOINT_TABLE = 'ingest_checkpoint'
+
+DOCS_STAGING_COLUMNS = ['file_order', 'source_file', 'recipe_name', 'markdown_doc']
+EMBEDDINGS_STAGING_COLUMNS = [
+    'item_order', 'recipe_name', 'display_name', 'description', 'tags',
+    'is_composite', 'recipe_count', 'options', 'embedding', 'embedding_text_hash'
+]
+
+# Suffixes that appear in file paths but not in recipe names
+RECIPE_PATH_SUFFIXES = ('-recipe', '-moderne-edition', '-community-edition', '-best-practices')
+
+# Normalized path -> recipe name index (set in each parser worker)
+_name_index: Dict[str, str] = {}
+
+# Embedding model of an encoder worker process
+_worker_model = None
+
+STAGE_TITLES = {
+    'docs': "Stage 3: Ingest Documentation to Database",
+    'embeddings': "Stage 3b: Generate Recipe Embeddings",
+    'all': "Stage 3: Ingest Documentation, Metadata and Embeddings",
+}
+
+
+def extract_recipe_name_from_markdown(markdown: str, normalized_path: str) -> Optional[str]:
+    """
+    Extract recipe name from markdown by finding bold pattern containing normalized path.
+
+    Args:
+        markdown: The markdown content to search
+        normalized_path: The normalized path (e.g., "java.spring.boot3.upgradespringboot_3_0")
+
+    Returns:
+        The full recipe name if found, None otherwise
+
+    Examples:
+        normalized_path: "java.spring.boot3.upgradespringboot_3_0"
+        markdown contains: "**org.openrewrite.java.spring.boot3.UpgradeSpringBoot\_3\_0**"
+        returns: "org.openrewrite.java.spring.boot3.UpgradeSpringBoot_3_0"
+
+        normalized_path: "core.renamefile"
+        markdown contains: "**org.openrewrite.RenameFile**"
+        returns: "org.openrewrite.RenameFile"
+    """
+    # Find all bold patterns **...**
+    pattern = r'\*\*([^*]+)\*\*'
+    matches = re.finditer(pattern, markdown)
+
+    # Search for a match containing the normalized path (case-insensitive)
+    # Strip 'core.' prefix as core recipes are under org.openrewrite directly
+    search_path = normalized_path
+    if search_path.startswith('core.'):
+        search_path = search_path[5:]  # Remove 'core.' prefix
+
+    # Strip common suffixes that appear in file paths but not in recipe names
+    for suffix in RECIPE_PATH_SUFFIXES:
+        if search_path.endswith(suffix):
+            search_path = search_path[:-len(suffix)]
+            break
+
+    # In markdown, underscores are escaped as \_, so we need to escape them in our search string
+    normalized_lower = search_path.lower().replace('_', r'\_')
+
+    for match in matches:
+        bold_content = match.group(1)
+        if normalized_lower in bold_content.lower():
+            return bold_content.strip()
+
+    return None
+
+
+def build_recipe_name_index(recipe_names: Iterable[str]) -> Dict[str, str]:
+    """
+    Build a normalized-path -> recipe name index in one pass over all names.
+
+    Markdown files live at the recipe name's package path with an unknown
+    prefix stripped (org.openrewrite., io.moderne., ...), so every dotted
+    suffix of the lowercased name is a key. Keys shared by different recipes
+    are dropped; files hitting them fall back to the markdown scan.
+
+    Example:
+        "org.openrewrite.java.spring.boot3.UpgradeSpringBoot_3_0" is found under
+        "java.spring.boot3.upgradespringboot_3_0" (and every shorter suffix)
+    """
+    index = {}
+    ambiguous = set()
+    for recipe_name in recipe_names:
+        parts = recipe_name.lower().split('.')
+        for i in range(len(parts)):
+            key = '.'.join(parts[i:])
+            if key in ambiguous:
+                continue
+            existing = index.get(key)
+            if existing is None:
+                index[key] = recipe_name
+            elif existing != recipe_name:
+                del index[key]
+                ambiguous.add(key)
+    return index
+
+
+def lookup_recipe_name(normalized_path: str, name_index: Dict[str, str]) -> Optional[str]:
+    """
+    Resolve a normalized file path to a recipe name via the index.
+
+    Returns:
+        The recipe name, or None if the path is not (unambiguously) indexed
+    """
+    key = normalized_path.lower()
+    candidates = [key]
+    for suffix in RECIPE_PATH_SUFFIXES:
+        if key.endswith(suffix):
+            candidates.append(key[:-len(suffix)])
+            break
+    # Core recipes are under org.openrewrite directly
+    candidates += [c[5:] for c in candidates if c.startswith('core.')]
+
+    for candidate in candidates:
+        recipe_name = name_index.get(candidate)
+        if recipe_name:
+            return recipe_name
+    return None
+
+
+def path_to_normalized_name(file_path: Path, recipes_base: Path) -> str:
+    """
+    Convert file path to normalized recipe path for matching.
+
+    Example:
+        recipes/java/spring/boot3/upgradespringboot_3_0.md
+        -> java.spring.boot3.upgradespringboot_3_0
+    """
+    # Get relative path from recipes base
+    rel_path = file_path.relative_to(recipes_base)
+
+    # Remove .md extension
+    path_without_ext = rel_path.with_suffix('')
+
+    # Convert path separators to dots
+    normalized = str(path_without_ext).replace('/', '.')
+
+    return normalized
+
+
+def extract_recipe_name(file_path: Path, markdown: str, recipes_base: Path) -> str:
+    """
+    Extract recipe name by finding bold pattern containing normalized path.
+
+    Process:
+    1. Convert file path to normalized name (e.g., java/spring/boot3/upgradespringboot.md -> java.spring.boot3.upgradespringboot)
+    2. Find bold pattern **...** containing this normalized path (case-insensitive)
+    3. Return the full content between ** markers as the recipe name
+
+    Raises:
+        ValueError: If recipe name cannot be extracted
+    """
+    # Get normalized path from file
+    normalized_path = path_to_normalized_name(file_path, recipes_base)
+
+    # Extract recipe name from markdown using normalized path
+    recipe_name = extract_recipe_name_from_markdown(markdown, normalized_path)
+
+    if recipe_name:
+        return recipe_name
+
+    # If not found, raise error with helpful message
+    raise ValueError(
+        f"Could not extract recipe name from {file_path.name}. "
+        f"Expected to find bold pattern containing '{normalized_path}' (case-insensitive)"
+    )
+
+
+def init_parser_worker(name_index: Dict[str, str]):
+    """Install the recipe name index in a parser worker process."""
+    global _name_index
+    _name_index = name_index
+
+
+def parse_recipe_files(chunk: List[Tuple[int, Path]]) -> List[Tuple[int, str, Optional[str], Optional[str], Optional[str], Optional[str]]]:
+    """
+    Read and parse a chunk of markdown files (runs in a worker process).
+
+    Recipe names are looked up in the name index; the markdown scan is only
+    used for files the index cannot resolve.
+
+    Args:
+        chunk: List of (file_order, file_path) tuples
+
+    Returns:
+        List of (file_order, file_name, recipe_name, markdown_doc, resolved_by, error)
+        tuples; resolved_by is 'index' or 'markdown', and recipe_name,
+        markdown_doc and resolved_by are None when error is set
+    """
+    results = []
+    for file_order, md_file in chunk:
+        try:
+            markdown_content = md_file.read_text(encoding='utf-8')
+            recipe_name = lookup_recipe_name(path_to_normalized_name(md_file, RECIPES_DIR), _name_index)
+            resolved_by = 'index'
+            if recipe_name is None:
+                recipe_name = extract_recipe_name(md_file, markdown_content, RECIPES_DIR)
+                resolved_by = 'markdown'
+            results.append((file_order, md_file.name, recipe_name, markdown_content, resolved_by, None))
+        except Exception as e:
+            results.append((file_order, md_file.name, None, None, None, str(e)))
+    return results
+
+
+async def produce_recipe_rows(
+    numbered_files: List[Tuple[int, Path]],
+    name_index: Dict[str, str],
+    queue: asyncio.Queue,
+    errors: List[Tuple[str, str]],
+    resolved_counts: Dict[str, int],
+    meter: "StageMeter",
+    name_queue: Optional[asyncio.Queue] = None
+):
+    """
+    Parse markdown files in a process pool and put staging rows on the queue.
+
+    numbered_files holds (file_order, path) pairs; file_order is the file's
+    position in the full sorted file list, so it stays stable across resumed
+    runs. Chunks are submitted up to PARSE_WORKERS * 2 ahead and collected in
+    file order. The bounded queues block the producer while the consumers catch
+    up. Resolved recipe names are also put on name_queue (if given) to drive
+    the embedding stage. A None sentinel marks the end of each stream.
+    """
+    paths = dict(numbered_files)
+    chunks = [
+        numbered_files[i:i + config.PARSE_CHUNK_SIZE]
+        for i in range(0, len(numbered_files), config.PARSE_CHUNK_SIZE)
+    ]
+    loop = asyncio.get_running_loop()
+    max_in_flight = config.PARSE_WORKERS * 2
+
+    with ProcessPoolExecutor(
+        max_workers=config.PARSE_WORKERS,
+        initializer=init_parser_worker,
+        initargs=(name_index,)
+    ) as pool:
+        pending = deque()
+        next_chunk = 0
+        while pending or next_chunk < len(chunks):
+            while next_chunk < len(chunks) and len(pending) < max_in_flight:
+                pending.append(loop.run_in_executor(pool, parse_recipe_files, chunks[next_chunk]))
+                next_chunk += 1
+
+            for file_order, file_name, recipe_name, markdown_content, resolved_by, error in await pending.popleft():
+                meter.add(1)
+                if error:
+                    errors.append((file_name, error))
+                    logger.log(f"  ✗ Error processing {file_name}: {error}")
+                    continue
+                resolved_counts[resolved_by] += 1
+                logger.log(f"  ✓ {recipe_name}")
+                source_file = str(paths[file_order].relative_to(RECIPES_DIR))
+                await queue.put((file_order, source_file, recipe_name, markdown_content))
+                if name_queue is not None:
+                    await name_queue.put(recipe_name)
+
+    # Only signalled on success; on failure run_stages cancels the consumers
+    await queue.put(None)
+    if name_queue is not None:
+        await name_queue.put(None)
+
+
+async def drain_queue(queue: asyncio.Queue, meter: Optional["StageMeter"] = None) -> AsyncIterator[Tuple]:
+    """Yield items from the queue until the end-of-stream sentinel."""
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        if meter is not None:
+            meter.add(1)
+        yield item
+
+
+def create_embedding_text(metadata: Dict) -> str:
+    """
+    Create structured text for embedding from recipe metadata.
+
+    Format:
+        Recipe: [displayName or name]
+        Description: [description]
+        Tags: [comma-separated tags]
+        Full name: [fully qualified name]
+
+    Args:
+        metadata: Recipe metadata dictionary
+
+    Returns:
+        Structured text suitable for embedding
+    """
+    name = metadata.get('name', '')
+    display_name = metadata.get('displayName') or name.split('.')[-1]
+    description = metadata.get('description', '')
+    tags = metadata.get('tags', [])
+
+    # Build structured text
+    parts = [
+        f"Recipe: {display_name}",
+    ]
+
+    if description:
+        parts.append(f"Description: {description}")
+
+    if tags:
+        parts.append(f"Tags: {', '.join(tags)}")
+
+    parts.append(f"Full name: {name}")
+
+    return '\n'.join(parts)
+
+
+def compute_text_hash(text: str) -> str:
+    """SHA-256 hex digest of an embedding text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# Metadata fields read by create_embedding_text and metadata_row
+INGESTED_METADATA_FIELDS = ('name', 'displayName', 'description', 'tags', 'isComposite', 'recipeCount', 'options')
+
+# Option fields kept in recipe_metadata.options
+OPTION_FIELDS = ('name', 'type', 'displayName', 'description', 'example', 'valid', 'required')
+
+
+def extract_option_schemas(metadata: Dict) -> List[Dict]:
+    """
+    Extract option schemas from recipe metadata.
+
+    Args:
+        metadata: Recipe metadata dictionary
+
+    Returns:
+        List of option dictionaries limited to OPTION_FIELDS (null fields dropped)
+    """
+    return [
+        {field: option[field] for field in OPTION_FIELDS if option.get(field) is not None}
+        for option in metadata.get('options') or []
+    ]
+
+
+def compute_nearest_neighbors(
+    vectors: np.ndarray,
+    top_n: int,
+    block_size: int = 1024
+):
+    """
+    Compute the top-N cosine nearest neighbors of every vector.
+
+    Runs one all-pairs pass as blocked matrix products so memory stays at
+    block_size x N similarities regardless of corpus size.
+
+    Args:
+        vectors: Matrix of embeddings, one row per recipe
+        top_n: Number of neighbors per recipe (self excluded)
+        block_size: Rows per similarity block
+
+    Returns:
+        Tuple of (neighbor indices, similarities), each shaped (N, top_n)
+        and ordered from most to least similar
+    """
+    count = len(vectors)
+    top_n = min(top_n, count - 1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    normalized = (vectors / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    indices = np.empty((count, top_n), dtype=np.int64)
+    similarities = np.empty((count, top_n), dtype=np.float32)
+
+    for start in range(0, count, block_size):
+        end = min(start + block_size, count)
+        block = normalized[start:end] @ normalized.T
+        # Exclude each recipe from its own neighbor list
+        block[np.arange(end - start), np.arange(start, end)] = -np.inf
+
+        candidates = np.argpartition(-block, top_n - 1, axis=1)[:, :top_n]
+        candidate_scores = np.take_along_axis(block, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        indices[start:end] = np.take_along_axis(candidates, order, axis=1)
+        similarities[start:end] = np.take_along_axis(candidate_scores, order, axis=1)
+
+    return indices, similarities
+
+
+async def load_model_embeddings(conn: asyncpg.Connection) -> Tuple[List[int], np.ndarray]:
+    """
+    Load all stored embeddings of the configured model.
+
+    Returns:
+        Tuple of (recipe ids, matrix of embeddings with one row per recipe id)
+    """
+    rows = await conn.fetch("""
+        SELECT recipe_id, embedding::text AS embedding
+        FROM recipe_embeddings
+        WHERE embedding_model = $1
+        ORDER BY recipe_id
+    """, config.EMBEDDING_MODEL)
+    vectors = np.array([json.loads(r['embedding']) for r in rows], dtype=np.float32)
+    return [r['recipe_id'] for r in rows], vectors.reshape(len(rows), config.EMBEDDING_DIMENSION)
+
+
+async def store_recipe_neighbors(conn: asyncpg.Connection, top_n: int):
+    """
+    Precompute related recipes from stored embeddings.
+
+    Loads all embeddings of the configured model, computes the top-N nearest
+    neighbors of each recipe and replaces the recipe_neighbors table contents.
+
+    Args:
+        conn: Database connection
+        top_n: Number of neighbors stored per recipe
+    """
+    logger.log(f"→ Computing top-{top_n} related recipes...", force=True)
+    start_time = time.time()
+
+    recipe_ids, vectors = await load_model_embeddings(conn)
+
+    if len(recipe_ids) < 2 or top_n < 1:
+        logger.log(f"  Skipping related recipes ({len(recipe_ids)} embeddings)", force=True)
+        return
+
+    indices, similarities = compute_nearest_neighbors(vectors, top_n)
+
+    records = [
+        (recipe_ids[i], recipe_ids[int(indices[i, rank])], rank + 1, float(similarities[i, rank]))
+        for i in range(len(recipe_ids))
+        for rank in range(indices.shape[1])
+    ]
+
+    async with conn.transaction():
+        await conn.execute("DELETE FROM recipe_neighbors")
+        await conn.copy_records_to_table(
+            'recipe_neighbors',
+            records=records,
+            columns=['recipe_id', 'neighbor_id', 'rank', 'similarity']
+        )
+
+    elapsed = time.time() - start_time
+    logger.log(f"✓ Stored {len(records)} related recipe links for {len(recipe_ids)} recipes ({elapsed:.1f}s)", force=True)
+
+
+async def recipe_neighbors_complete(conn: asyncpg.Connection, top_n: int) -> bool:
+    """Check that every embedded recipe has a full stored neighbor list."""
+    embedding_count = await conn.fetchval(
+        "SELECT COUNT(*) FROM recipe_embeddings WHERE embedding_model = $1",
+        config.EMBEDDING_MODEL
+    )
+    link_count = await conn.fetchval("SELECT COUNT(*) FROM recipe_neighbors")
+    return link_count == embedding_count * max(min(top_n, embedding_count - 1), 0)
+
+
+class StageMeter:
+    """Item count and wall-clock throughput of one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def add(self, count: int):
+        self.count += count
+
+    @property
+    def seconds(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.count / max(self.seconds, 1e-9)
+
+
+def iter_metadata(path: Path = None) -> Iterator[Dict]:
+    """
+    Stream the entries of recipe-metadata.json one at a time.
+
+    The file is read in chunks of METADATA_READ_SIZE and array items are
+    decoded as soon as they are complete, so memory stays bounded by the
+    largest entry rather than the whole file. Files that do not start with
+    '[' are read as JSON Lines (one entry per line). Yields nothing if the
+    file has not been generated.
+
+    Raises:
+        ValueError: If the file is not a JSON array of entries or JSON Lines
+    """
+    path = path or METADATA_FILE
+    if not path.exists():
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(METADATA_READ_SIZE).lstrip()
+        if not buffer.startswith('['):
+            # JSON Lines; the partially read last line is completed first
+            for line in chain((buffer + f.readline()).splitlines(), f):
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        pos = 1
+        eof = False
+        while True:
+            # Skip separators up to the next item or the closing bracket
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                if pos >= len(buffer):
+                    raise json.JSONDecodeError("Incomplete item", buffer, pos)
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"Malformed metadata file {path} near offset {pos}")
+                # Item not complete yet: keep its start, read (at least as much) more
+                buffer = buffer[pos:]
+                pos = 0
+                chunk = f.read(max(METADATA_READ_SIZE, len(buffer)))
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            pos = end
+
+
+def compact_metadata(metadata: Dict) -> Dict:
+    """Keep only the metadata fields ingestion uses (drops recipeList and option values)."""
+    compact = {field: metadata[field] for field in INGESTED_METADATA_FIELDS if field in metadata}
+    compact['options'] = extract_option_schemas(metadata)
+    return compact
+
+
+def load_embedding_model():
+    """Load the configured sentence-transformers model."""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        logger.log("✗ Error: sentence-transformers not installed.", force=True)
+        logger.log("  Install with: pip install sentence-transformers", force=True)
+        sys.exit(1)
+
+    logger.log(f"→ Loading embedding model: {config.EMBEDDING_MODEL}...", force=True)
+    logger.log(f"  (First run will download model, subsequent runs use cache)", force=True)
+    model = SentenceTransformer(config.EMBEDDING_MODEL)
+    logger.log(f"✓ Model loaded (dimension: {config.EMBEDDING_DIMENSION})", force=True)
+    return model
+
+
+def to_pgvector(embedding: Iterable[float]) -> str:
+    """Convert an embedding to PostgreSQL vector text format."""
+    return '[' + ','.join(str(x) for x in embedding) + ']'
+
+
+def encode_batch(model, texts: List[str]) -> np.ndarray:
+    """
+    Encode a batch of embedding texts (runs in a worker thread).
+
+    Raises:
+        ValueError: If the model dimension does not match EMBEDDING_DIMENSION
+    """
+    vectors = model.encode(texts, batch_size=len(texts), show_progress_bar=False)
+    if vectors.shape[1] != config.EMBEDDING_DIMENSION:
+        raise ValueError(
+            f"Embedding dimension mismatch: expected {config.EMBEDDING_DIMENSION}, got {vectors.shape[1]}"
+        )
+    return vectors
+
+
+def init_encoder_worker(model_name: str, threads: int):
+    """Load a private model copy in an encoder worker, pinned to a fixed number of threads."""
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, device='cpu')
+
+
+def encode_batch_in_worker(texts: List[str]) -> np.ndarray:
+    """Encode a batch with the encoder worker's model."""
+    return encode_batch(_worker_model, texts)
+
+
+def encode_pgvectors(model, texts: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Encode a batch and format the vectors for staging, off the event loop."""
+    vectors = encode_batch(model, texts)
+    return [to_pgvector(vector.tolist()) for vector in vectors], vectors
+
+
+def encode_pgvectors_in_worker(texts: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Encode a batch with the encoder worker's model, formatted for staging."""
+    return encode_pgvectors(_worker_model, texts)
+
+
+def cached_pgvectors(cache: EmbeddingCache, texts: List[str]) -> Dict[int, str]:
+    """Look up texts in the embedding cache, formatted for staging (position -> vector)."""
+    return {
+        position: to_pgvector(vector.tolist())
+        for position, vector in cache.get_many(texts).items()
+    }
+
+
+def create_encoder_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Start the encoder worker pool (EMBED_WORKERS > 1), or None to encode in-process.
+
+    Workers are spawned rather than forked: forking a process that already
+    initialized torch thread pools can deadlock.
+    """
+    if config.EMBED_WORKERS <= 1:
+        return None
+    logger.log(
+        f"→ Starting {config.EMBED_WORKERS} encoder workers "
+        f"({config.EMBED_THREADS} threads each)...",
+        force=True
+    )
+    pool = ProcessPoolExecutor(
+        max_workers=config.EMBED_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_encoder_worker,
+        initargs=(config.EMBEDDING_MODEL, config.EMBED_THREADS)
+    )
+    # Load the model copies now rather than on the first batches
+    for future in [pool.submit(encode_batch_in_worker, ['warm up']) for _ in range(config.EMBED_WORKERS)]:
+        future.result()
+    logger.log(f"✓ Encoder workers ready", force=True)
+    return pool
+
+
+def token_lengths(model, texts: List[str]) -> List[int]:
+    """
+    Count the tokens each text is encoded with (capped at the model's sequence length).
+
+    Falls back to character counts for models without a tokenizer.
+    """
+    if not texts:
+        # Fast tokenizers raise IndexError on an empty batch
+        return []
+    tokenizer = getattr(model, 'tokenizer', None)
+    if tokenizer is None:
+        return [len(text) for text in texts]
+    max_length = getattr(model, 'max_seq_length', None) or 512
+    input_ids = tokenizer(texts, add_special_tokens=False, truncation=True, max_length=max_length)['input_ids']
+    return [len(ids) for ids in input_ids]
+
+
+def length_sorted_batches(lengths: List[int], batch_size: int) -> List[List[int]]:
+    """
+    Split text positions into batches of similar token length.
+
+    Each batch is padded to its longest text, so sorting by length first keeps
+    padding (and wasted compute) low.
+
+    Returns:
+        Lists of positions into the original text list
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def metadata_row(
+    item_order: int,
+    metadata: Dict,
+    embedding_text_hash: str,
+    embedding: Optional[str]
+) -> Tuple:
+    """Build a recipe_embeddings_staging row (embedding is None when unchanged)."""
+    return (
+        item_order,
+        metadata['name'],
+        metadata.get('displayName'),
+        metadata.get('description'),
+        metadata.get('tags', []),
+        metadata.get('isComposite', False),
+        metadata.get('recipeCount', 0),
+        json.dumps(extract_option_schemas(metadata)),
+        embedding,
+        embedding_text_hash
+    )
+
+
+async def load_embedding_text_hashes(
+    conn: asyncpg.Connection,
+    recipe_names: List[str]
+) -> Dict[str, Optional[str]]:
+    """
+    Resolve metadata recipe names against the database in a single query.
+
+    Returns:
+        Dictionary of recipe_name -> embedding_text_hash of the stored embedding
+        of the configured model (None if not embedded yet), for every given
+        recipe present in the recipes table
+    """
+    rows = await conn.fetch("""
+        SELECT r.recipe_name, e.embedding_text_hash
+        FROM recipes r
+        LEFT JOIN recipe_embeddings e
+          ON e.recipe_id = r.id AND e.embedding_model = $2
+        WHERE r.recipe_name = ANY($1::text[])
+    """, recipe_names, config.EMBEDDING_MODEL)
+    return {r['recipe_name']: r['embedding_text_hash'] for r in rows}
+
+
+async def metadata_for_parsed_recipes(
+    name_queue: asyncio.Queue,
+    metadata_by_name: Dict[str, Dict],
+    counts: Dict[str, int],
+    staged_docs: Iterable[str] = (),
+    staged_embeddings: Set[str] = frozenset()
+) -> AsyncIterator[Dict]:
+    """
+    Yield the metadata of each recipe parsed from markdown (single-pass mode).
+
+    On resume, recipes whose docs were staged by the previous run (and are not
+    parsed again) come first; recipes with staged embeddings are skipped.
+    """
+    async def recipe_names():
+        for recipe_name in staged_docs:
+            yield recipe_name
+        async for recipe_name in drain_queue(name_queue):
+            yield recipe_name
+
+    async for recipe_name in recipe_names():
+        if recipe_name in staged_embeddings:
+            continue
+        metadata = metadata_by_name.get(recipe_name)
+        if metadata is None:
+            counts['no_metadata'] += 1
+            logger.log(f"  Warning: No metadata for recipe: {recipe_name}", force=config.VERBOSE)
+            continue
+        yield metadata
+
+
+async def metadata_for_known_recipes(
+    metadata_items: Iterable[Dict],
+    known_names: Set[str],
+    counts: Dict[str, int],
+    staged_embeddings: Set[str] = frozenset()
+) -> AsyncIterator[Dict]:
+    """
+    Yield the metadata entries whose recipe is already in the database (embeddings mode).
+
+    metadata_items is typically iter_metadata(), so entries are encoded while
+    the file is still being read. On resume, entries with staged embeddings
+    are skipped.
+    """
+    for metadata in metadata_items:
+        recipe_name = metadata.get('name')
+        if recipe_name in staged_embeddings:
+            continue
+        if not recipe_name:
+            logger.log(f"  Warning: Skipping recipe with no name: {metadata}", force=config.VERBOSE)
+            counts['skipped'] += 1
+        elif recipe_name not in known_names:
+            logger.log(f"  Warning: Recipe not found in database: {recipe_name}", force=config.VERBOSE)
+            counts['skipped'] += 1
+        else:
+            yield metadata
+
+
+async def embed_recipes(
+    source: AsyncIterator[Dict],
+    model,
+    existing_hashes: Dict[str, Optional[str]],
+    queue: asyncio.Queue,
+    counts: Dict[str, int],
+    meter: StageMeter,
+    first_item_order: int = 0,
+    encoder_pool: Optional[ProcessPoolExecutor] = None,
+    cache: Optional[EmbeddingCache] = None
+):
+    """
+    Build metadata rows and embed changed recipes in batches.
+
+    Recipes whose embedding text hash matches the stored embedding are passed
+    on without a vector. Changed recipes are collected into a window of
+    EMBED_SORT_WINDOW texts (0 = the whole stream). Texts found in the
+    embedding cache are not encoded; the rest are sorted by token length and
+    encoded in batches of EMBED_BATCH_SIZE in a thread, so parsing and the
+    COPY writers keep running meanwhile. The next batch is already submitted
+    while the rows of the previous one are queued, so the encoder never waits
+    for the writer unless the queue is full. With an encoder pool, up to
+    EMBED_WORKERS * 2 batches are encoded in parallel. Batches are collected
+    in submission order, so the output does not depend on encoder timing.
+    Each vector goes back to its recipe's row; rows keep their item_order.
+    New vectors are added to the cache. A None sentinel marks the end of the
+    stream.
+    """
+    loop = asyncio.get_running_loop()
+    window = []
+    max_in_flight = config.EMBED_WORKERS * 2 if encoder_pool else 2
+
+    def submit(texts: List[str]) -> asyncio.Future:
+        if encoder_pool:
+            return loop.run_in_executor(encoder_pool, encode_pgvectors_in_worker, texts)
+        return loop.run_in_executor(None, encode_pgvectors, model, texts)
+
+    async def emit(positions: List[int], vectors: List[str]):
+        for position, vector in zip(positions, vectors):
+            item_order, metadata, _, text_hash = window[position]
+            await queue.put(metadata_row(item_order, metadata, text_hash, vector))
+            logger.log(f"  ✓ Embedded: {metadata['name']}", force=config.VERBOSE)
+        counts['changed'] += len(positions)
+        meter.add(len(positions))
+
+    def disable_cache(error: sqlite3.Error):
+        # Cache failures are never fatal: continue encoding without it
+        nonlocal cache
+        logger.log(f"⚠ Embedding cache disabled after error: {error}", force=True)
+        cache = None
+
+    async def flush():
+        texts = [text for _, _, text, _ in window]
+
+        hits = {}
+        if cache is not None:
+            try:
+                hits = await loop.run_in_executor(None, cached_pgvectors, cache, texts)
+            except sqlite3.Error as e:
+                disable_cache(e)
+            else:
+                counts['cache_hits'] += len(hits)
+                counts['cache_misses'] += len(texts) - len(hits)
+                await emit(list(hits), list(hits.values()))
+
+        misses = [position for position in range(len(texts)) if position not in hits]
+        if not misses:
+            # Every text came from the cache
+            window.clear()
+            return
+        lengths = await loop.run_in_executor(None, token_lengths, model, [texts[i] for i in misses])
+        batches = deque(
+            [misses[i] for i in batch]
+            for batch in length_sorted_batches(lengths, config.EMBED_BATCH_SIZE)
+        )
+        pending = deque()
+        while pending or batches:
+            while batches and len(pending) < max_in_flight:
+                positions = batches.popleft()
+                pending.append((positions, submit([texts[i] for i in positions])))
+
+            positions, future = pending.popleft()
+            try:
+                pgvectors, vectors = await future
+            except BaseException:
+                for _, other in pending:
+                    other.cancel()
+                raise
+            await emit(positions, pgvectors)
+            if cache is not None:
+                try:
+                    await loop.run_in_executor(None, cache.put_many, [texts[i] for i in positions], vectors)
+                except sqlite3.Error as e:
+                    disable_cache(e)
+        window.clear()
+
+    item_order = first_item_order
+    async for metadata in source:
+        embedding_text = create_embedding_text(metadata)
+        text_hash = compute_text_hash(embedding_text)
+
+        if existing_hashes.get(metadata['name']) == text_hash:
+            await queue.put(metadata_row(item_order, metadata, text_hash, None))
+            counts['unchanged'] += 1
+            meter.add(1)
+        else:
+            window.append((item_order, metadata, embedding_text, text_hash))
+            if config.EMBED_SORT_WINDOW and len(window) >= config.EMBED_SORT_WINDOW:
+                await flush()
+        item_order += 1
+
+    if window:
+        await flush()
+    await queue.put(None)
+
+
+async def copy_stream(
+    conn: asyncpg.Connection,
+    table: str,
+    columns: List[str],
+    queue: asyncio.Queue,
+    meter: StageMeter
+):
+    """
+    COPY rows from the queue into a staging table until the end-of-stream sentinel.
+
+    Every CHECKPOINT_BATCH_SIZE rows are copied and committed as one batch, so
+    an interrupted run loses at most the last batch.
+    """
+    batch = []
+    async for row in drain_queue(queue):
+        batch.append(row)
+        if len(batch) >= config.CHECKPOINT_BATCH_SIZE:
+            await conn.copy_records_to_table(table, records=batch, columns=columns)
+            meter.add(len(batch))
+            batch = []
+    if batch:
+        await conn.copy_records_to_table(table, records=batch, columns=columns)
+        meter.add(len(batch))
+
+
+async def run_stages(stages: List[Tuple], progress_bar: tqdm, driver: StageMeter):
+    """
+    Run the pipeline stages concurrently, showing per-stage throughput.
+
+    Each stage is a (coroutine, meter) pair; a meter stops when its stage
+    finishes, so stages that finish early report their own rate. If any stage
+    fails, the others are cancelled so no stage is left waiting on a queue.
+    """
+    meters = [meter for _, meter in stages]
+
+    async def run(coroutine, meter: StageMeter):
+        try:
+            await coroutine
+        finally:
+            meter.stop()
+
+    for meter in meters:
+        meter.start()
+    tasks = [asyncio.create_task(run(coroutine, meter)) for coroutine, meter in stages]
+
+    async def report():
+        while True:
+            progress_bar.update(driver.count - progress_bar.n)
+            progress_bar.set_postfix({meter.name: f"{meter.rate:.0f}/s" for meter in meters})
+            await asyncio.sleep(0.5)
+
+    reporter = asyncio.create_task(report())
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        reporter.cancel()
+        progress_bar.update(driver.count - progress_bar.n)
+        progress_bar.close()
+
+
+async def create_staging_tables(conn: asyncpg.Connection, mode: str):
+    """
+    Create the unlogged staging tables and the checkpoint record of this run.
+
+    They are committed up front so that the docs and embeddings writers can
+    COPY into them over separate connections.
+    """
+    await drop_staging_tables(conn)
+    await conn.execute(f"""
+        CREATE UNLOGGED TABLE {CHECKPOINT_TABLE} (
+            mode VARCHAR(20) NOT NULL,
+            embedding_model VARCHAR(200) NOT NULL,
+            started_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    await conn.execute(
+        f"INSERT INTO {CHECKPOINT_TABLE} (mode, embedding_model) VALUES ($1, $2)",
+        mode, config.EMBEDDING_MODEL
+    )
+    if mode in ('docs', 'all'):
+        await conn.execute(f"""
+            CREATE UNLOGGED TABLE {DOCS_STAGING_TABLE} (
+                file_order INTEGER NOT NULL,
+                source_file TEXT NOT NULL,
+                recipe_name VARCHAR(500) NOT NULL,
+                markdown_doc TEXT NOT NULL
+            )
+        """)
+    if mode in ('embeddings', 'all'):
+        await conn.execute(f"""
+            CREATE UNLOGGED TABLE {EMBEDDINGS_STAGING_TABLE} (
+                item_order INTEGER NOT NULL,
+                recipe_name VARCHAR(500) NOT NULL,
+                display_name VARCHAR(500),
+                description TEXT,
+                tags TEXT[],
+                is_composite BOOLEAN,
+                recipe_count INTEGER,
+                options TEXT,
+                embedding TEXT,  -- pgvector text format; NULL when the stored embedding is unchanged
+                embedding_text_hash VARCHAR(64) NOT NULL
+            )
+        """)
+
+
+async def drop_staging_tables(conn: asyncpg.Connection):
+    """Drop the staging tables and checkpoint (also leftovers of an aborted run)."""
+    await conn.execute(
+        f"DROP TABLE IF EXISTS {DOCS_STAGING_TABLE}, {EMBEDDINGS_STAGING_TABLE}, {CHECKPOINT_TABLE}"
+    )
+
+
+async def start_or_resume(conn: asyncpg.Connection, mode: str, resume: bool) -> Dict:
+    """
+    Start a fresh run, or pick up the staging tables left by an interrupted one.
+
+    Returns:
+        Dictionary of what is already staged: 'docs' (source_file -> recipe_name),
+        'embeddings' (set of recipe names) and 'next_item_order'
+    """
+    staged = {'docs': {}, 'embeddings': set(), 'next_item_order': 0}
+
+    if resume:
+        checkpoint = None
+        if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", CHECKPOINT_TABLE):
+            checkpoint = await conn.fetchrow(f"SELECT mode, embedding_model, started_at FROM {CHECKPOINT_TABLE}")
+
+        if checkpoint is None:
+            logger.log(f"⚠ No checkpoint found, starting from scratch", force=True)
+        elif checkpoint['mode'] != mode or checkpoint['embedding_model'] != config.EMBEDDING_MODEL:
+            logger.log(
+                f"✗ Error: Checkpoint belongs to a '{checkpoint['mode']}' run with model "
+                f"'{checkpoint['embedding_model']}'; rerun that mode or start without --resume",
+                force=True
+            )
+            sys.exit(1)
+        else:
+            if mode in ('docs', 'all'):
+                rows = await conn.fetch(f"SELECT source_file, recipe_name FROM {DOCS_STAGING_TABLE}")
+                staged['docs'] = {r['source_file']: r['recipe_name'] for r in rows}
+            if mode in ('embeddings', 'all'):
+                rows = await conn.fetch(f"SELECT recipe_name, item_order FROM {EMBEDDINGS_STAGING_TABLE}")
+                staged['embeddings'] = {r['recipe_name'] for r in rows}
+                staged['next_item_order'] = max((r['item_order'] for r in rows), default=-1) + 1
+            logger.log(
+                f"✓ Resuming run started {checkpoint['started_at']:%Y-%m-%d %H:%M:%S}: "
+                f"{len(staged['docs'])} files and {len(staged['embeddings'])} embeddings already staged",
+                force=True
+            )
+            return staged
+
+    await create_staging_tables(conn, mode)
+    return staged
+
+
+async def merge_docs(conn: asyncpg.Connection, prune: bool) -> Dict[str, int]:
+    """
+    Merge the docs staging table into recipes.
+
+    On duplicate names the last file wins. Rows whose content hash is
+    unchanged are not rewritten. With prune, recipes missing from the staging
+    table (vanished from the generator output) are deleted.
+
+    Returns:
+        Dictionary with added, updated, unchanged and deleted counts
+    """
+    stats = await conn.fetchrow(f"""
+        WITH merged AS (
+            INSERT INTO recipes (recipe_name, markdown_doc, content_hash)
+            SELECT DISTINCT ON (recipe_name)
+                recipe_name,
+                markdown_doc,
+                encode(sha256(convert_to(markdown_doc, 'UTF8')), 'hex')
+            FROM {DOCS_STAGING_TABLE}
+            ORDER BY recipe_name, file_order DESC
+            ON CONFLICT (recipe_name) DO UPDATE
+            SET markdown_doc = EXCLUDED.markdown_doc,
+                content_hash = EXCLUDED.content_hash,
+                updated_at = NOW()
+            WHERE recipes.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT
+            COUNT(*) FILTER (WHERE inserted) AS added,
+            COUNT(*) FILTER (WHERE NOT inserted) AS updated,
+            (SELECT COUNT(DISTINCT recipe_name) FROM {DOCS_STAGING_TABLE}) AS merged
+        FROM merged
+    """)
+
+    deleted = 0
+    if prune:
+        status = await conn.execute(f"""
+            DELETE FROM recipes r
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {DOCS_STAGING_TABLE} s WHERE s.recipe_name = r.recipe_name
+            )
+        """)
+        deleted = int(status.split()[-1])
+
+    return {
+        'added': stats['added'],
+        'updated': stats['updated'],
+        'unchanged': stats['merged'] - stats['added'] - stats['updated'],
+        'deleted': deleted
+    }
+
+
+async def merge_embeddings(conn: asyncpg.Connection, prune: bool) -> Dict[str, int]:
+    """
+    Merge the embeddings staging table into recipe_metadata and recipe_embeddings.
+
+    Staging rows are matched to recipes by name once, into a temporary table
+    (dropped on commit) that all following statements read by recipe id; on
+    duplicate names the last row wins. Metadata rows are only rewritten when
+    they differ; embeddings only when re-encoded. With prune, metadata and
+    embeddings of recipes without a staging row are deleted. Must run inside
+    a transaction.
+
+    Returns:
+        Dictionary with written and deleted embedding counts
+    """
+    await conn.execute(f"""
+        CREATE TEMP TABLE {RESOLVED_EMBEDDINGS_TABLE} ON COMMIT DROP AS
+        SELECT DISTINCT ON (s.recipe_name) r.id AS recipe_id, s.*
+        FROM {EMBEDDINGS_STAGING_TABLE} s
+        JOIN recipes r ON r.recipe_name = s.recipe_name
+        ORDER BY s.recipe_name, s.item_order DESC
+    """)
+    await conn.execute(f"CREATE UNIQUE INDEX ON {RESOLVED_EMBEDDINGS_TABLE} (recipe_id)")
+    await conn.execute(f"ANALYZE {RESOLVED_EMBEDDINGS_TABLE}")
+
+    await conn.execute(f"""
+        INSERT INTO recipe_metadata (
+            recipe_id, display_name, description, tags,
+            is_composite, recipe_count, options, updated_at
+        )
+        SELECT
+            recipe_id, display_name, description, tags,
+            is_composite, recipe_count, options::jsonb, NOW()
+        FROM {RESOLVED_EMBEDDINGS_TABLE}
+        ON CONFLICT (recipe_id) DO UPDATE SET
+            display_name = EXCLUDED.display_name,
+            description = EXCLUDED.description,
+            tags = EXCLUDED.tags,
+            is_composite = EXCLUDED.is_composite,
+            recipe_count = EXCLUDED.recipe_count,
+            options = EXCLUDED.options,
+            updated_at = NOW()
+        WHERE (
+            recipe_metadata.display_name, recipe_metadata.description, recipe_metadata.tags,
+            recipe_metadata.is_composite, recipe_metadata.recipe_count, recipe_metadata.options
+        ) IS DISTINCT FROM (
+            EXCLUDED.display_name, EXCLUDED.description, EXCLUDED.tags,
+            EXCLUDED.is_composite, EXCLUDED.recipe_count, EXCLUDED.options
+        )
+    """)
+
+    written = await conn.fetchval(f"""
+        WITH merged AS (
+            INSERT INTO recipe_embeddings (
+                recipe_id, embedding, embedding_model, embedding_text_hash
+            )
+            SELECT recipe_id, embedding::vector, $1, embedding_text_hash
+            FROM {RESOLVED_EMBEDDINGS_TABLE}
+            WHERE embedding IS NOT NULL
+            ON CONFLICT (recipe_id, embedding_model) DO UPDATE SET
+                embedding = EXCLUDED.embedding,
+                embedding_text_hash = EXCLUDED.embedding_text_hash,
+                created_at = NOW()
+            RETURNING 1
+        )
+        SELECT COUNT(*) FROM merged
+    """, config.EMBEDDING_MODEL)
+
+    deleted = 0
+    if prune:
+        await conn.execute(f"""
+            DELETE FROM recipe_metadata m
+            WHERE NOT EXISTS (SELECT 1 FROM {RESOLVED_EMBEDDINGS_TABLE} s WHERE s.recipe_id = m.recipe_id)
+        """)
+        status = await conn.execute(f"""
+            DELETE FROM recipe_embeddings e
+            WHERE e.embedding_model = $1
+              AND NOT EXISTS (SELECT 1 FROM {RESOLVED_EMBEDDINGS_TABLE} s WHERE s.recipe_id = e.recipe_id)
+        """, config.EMBEDDING_MODEL)
+        deleted = int(status.split()[-1])
+
+    return {'written': written, 'deleted': deleted}
+
+
+async def vector_index_state(conn: asyncpg.Connection, name: str = VECTOR_INDEX) -> Optional[asyncpg.Record]:
+    """
+    Look up an HNSW index of the recipe_embeddings table in use.
+
+    Returns:
+        Record with the index's schema, operator class, storage options and
+        size, or None if missing
+    """
+    return await conn.fetchrow("""
+        SELECT n.nspname AS schema,
+               opc.opcname AS opclass,
+               COALESCE(i.reloptions, '{}') AS options,
+               pg_relation_size(i.oid) AS size
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_namespace n ON n.oid = i.relnamespace
+        JOIN pg_opclass opc ON opc.oid = x.indclass[0]
+        WHERE x.indrelid = 'recipe_embeddings'::regclass AND i.relname = $1
+    """, name)
+
+
+async def vector_index_rebuild_reason(conn: asyncpg.Connection) -> Optional[str]:
+    """
+    Decide whether the embeddings merge should drop the HNSW index and rebuild it.
+
+    Inserting into an HNSW index row by row is far slower than building it
+    once, so the index is rebuilt when it is missing, was built with other
+    parameters or another VECTOR_QUANTIZATION, or when at least HNSW_REBUILD_FRACTION of the embeddings are
+    about to be rewritten. Small incremental updates keep the index.
+
+    Returns:
+        Reason for a rebuild, or None to keep the index
+    """
+    index = await vector_index_state(conn)
+    if index is None:
+        return "index missing"
+
+    opclass = VECTOR_INDEX_KEYS[config.VECTOR_QUANTIZATION][1]
+    if index['opclass'] != opclass:
+        return f"quantization changed ({index['opclass']} -> {opclass})"
+
+    wanted = {f"m={config.HNSW_M}", f"ef_construction={config.HNSW_EF_CONSTRUCTION}"}
+    if set(index['options']) != wanted:
+        return f"parameters changed ({', '.join(index['options']) or 'defaults'})"
+
+    pending = await conn.fetchval(f"SELECT COUNT(*) FROM {EMBEDDINGS_STAGING_TABLE} WHERE embedding IS NOT NULL")
+    stored = await conn.fetchval("SELECT COUNT(*) FROM recipe_embeddings")
+    if pending and pending >= config.HNSW_REBUILD_FRACTION * stored:
+        return f"{pending} of {stored} embeddings rewritten"
+    return None
+
+
+async def drop_vector_index(conn: asyncpg.Connection, name: str = VECTOR_INDEX):
+    """Drop an HNSW index of the recipe_embeddings table in use (never one in another schema)."""
+    index = await vector_index_state(conn, name)
+    if index is not None:
+        await conn.execute(f'DROP INDEX "{index["schema"]}".{name}')
+
+
+async def create_hnsw_index(conn: asyncpg.Connection, name: str, key: str, opclass: str) -> float:
+    """
+    Build an HNSW index on recipe_embeddings in one pass with parallel maintenance workers.
+
+    maintenance_work_mem and max_parallel_maintenance_workers are raised for
+    this transaction only; the graph should fit into maintenance_work_mem,
+    or the build slows down considerably. Must run inside a transaction.
+
+    Args:
+        conn: Database connection
+        name: Index name
+        key: Indexed column or parenthesized expression
+        opclass: Operator class of the index key
+
+    Returns:
+        Build time in seconds
+    """
+    await conn.execute("SELECT set_config('maintenance_work_mem', $1, true)", config.INDEX_MAINTENANCE_WORK_MEM)
+    await conn.execute(
+        "SELECT set_config('max_parallel_maintenance_workers', $1, true)", str(config.INDEX_PARALLEL_WORKERS)
+    )
+
+    logger.log(
+        f"→ Building HNSW index {name} ({opclass}, m={config.HNSW_M}, "
+        f"ef_construction={config.HNSW_EF_CONSTRUCTION}, "
+        f"maintenance_work_mem={config.INDEX_MAINTENANCE_WORK_MEM}, "
+        f"{config.INDEX_PARALLEL_WORKERS} parallel workers)...",
+        force=True
+    )
+    start = time.perf_counter()
+    await conn.execute(f"""
+        CREATE INDEX {name}
+        ON recipe_embeddings USING hnsw ({key} {opclass})
+        WITH (m = {config.HNSW_M}, ef_construction = {config.HNSW_EF_CONSTRUCTION})
+    """)
+    return time.perf_counter() - start
+
+
+async def build_vector_index(conn: asyncpg.Connection) -> float:
+    """
+    Build the HNSW index on the embeddings (see create_hnsw_index).
+
+    With VECTOR_QUANTIZATION halfvec or binary, the index holds half-precision
+    or binary-quantized copies of the embeddings (about 2x or 32x smaller
+    vectors); searches re-rank its candidates with the full vectors.
+
+    Returns:
+        Build time in seconds
+    """
+    key, opclass = VECTOR_INDEX_KEYS[config.VECTOR_QUANTIZATION]
+    return await create_hnsw_index(
+        conn, VECTOR_INDEX, key.format(dimension=config.EMBEDDING_DIMENSION), opclass
+    )
+
+
+def fit_projection(
+    vectors: np.ndarray,
+    dimension: int,
+    method: str
+) -> Tuple[np.ndarray, np.ndarray, Optional[float]]:
+    """
+    Fit the projection from embeddings to reduced vectors.
+
+    'pca' centers the embeddings and keeps their top principal components
+    (eigenvectors of the covariance matrix, so memory does not grow with the
+    number of recipes); 'truncate' keeps the leading dimensions, for
+    Matryoshka-trained models whose prefixes are embeddings themselves.
+    Reduced vectors are (embedding - mean) @ components.T.
+
+    Args:
+        vectors: Matrix of embeddings, one row per recipe
+        dimension: Number of reduced dimensions
+        method: 'pca' or 'truncate'
+
+    Returns:
+        Tuple of (mean, components shaped (dimension, embedding dimension),
+        share of the embedding variance kept or None for truncation)
+    """
+    if method == 'truncate':
+        mean = np.zeros(vectors.shape[1], dtype=np.float32)
+        return mean, np.eye(dimension, vectors.shape[1], dtype=np.float32), None
+
+    mean = vectors.mean(axis=0, dtype=np.float64)
+    centered = vectors - mean
+    eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered)
+    top = np.argsort(eigenvalues)[::-1][:dimension]
+    explained = float(eigenvalues[top].sum() / max(eigenvalues.sum(), 1e-12))
+    return mean.astype(np.float32), eigenvectors[:, top].T.astype(np.float32), explained
+
+
+async def reduced_embeddings_current(conn: asyncpg.Connection) -> bool:
+    """Check that every embedding has a reduced vector from the configured projection and index."""
+    projection = await conn.fetchrow(
+        "SELECT method, dimension FROM embedding_projections WHERE embedding_model = $1",
+        config.EMBEDDING_MODEL
+    )
+    if projection is None or tuple(projection) != (config.REDUCTION_METHOD, config.REDUCED_DIMENSION):
+        return False
+    missing = await conn.fetchval(
+        "SELECT COUNT(*) FROM recipe_embeddings WHERE embedding_model = $1 AND embedding_reduced IS NULL",
+        config.EMBEDDING_MODEL
+    )
+    return not missing and await vector_index_state(conn, REDUCED_INDEX) is not None
+
+
+async def store_reduced_embeddings(conn: asyncpg.Connection):
+    """
+    Fit the projection and store reduced vectors of all embeddings.
+
+    The projection is refitted on all stored embeddings, so every reduced
+    vector, the projection row and the reduced HNSW index are replaced in one
+    transaction. The MCP server loads the projection at startup, so it must be
+    restarted after a re-ingest to project queries the same way. Too few
+    embeddings to fit a PCA projection clear the previous one instead.
+    """
+    dimension, method = config.REDUCED_DIMENSION, config.REDUCTION_METHOD
+    logger.log(
+        f"→ Fitting {method} projection ({config.EMBEDDING_DIMENSION} -> {dimension} dimensions)...",
+        force=True
+    )
+    start_time = time.time()
+
+    recipe_ids, vectors = await load_model_embeddings(conn)
+    if method == 'pca' and len(recipe_ids) < dimension:
+        logger.log(f"  Skipping reduced vectors ({len(recipe_ids)} embeddings, {dimension} dimensions)", force=True)
+        await clear_reduced_embeddings(conn)
+        return
+
+    mean, components, explained = fit_projection(vectors, dimension, method)
+    reduced = (vectors - mean) @ components.T
+
+    async with conn.transaction():
+        await drop_vector_index(conn, REDUCED_INDEX)
+        await conn.execute(f"""
+            CREATE TEMP TABLE {REDUCED_EMBEDDINGS_TABLE} (
+                recipe_id INTEGER PRIMARY KEY,
+                embedding_reduced TEXT NOT NULL
+            ) ON COMMIT DROP
+        """)
+        await conn.copy_records_to_table(
+            REDUCED_EMBEDDINGS_TABLE,
+            records=[(recipe_id, to_pgvector(vector)) for recipe_id, vector in zip(recipe_ids, reduced)],
+            columns=['recipe_id', 'embedding_reduced']
+        )
+        await conn.execute(f"""
+            UPDATE recipe_embeddings e
+            SET embedding_reduced = t.embedding_reduced::vector
+            FROM {REDUCED_EMBEDDINGS_TABLE} t
+            WHERE e.recipe_id = t.recipe_id AND e.embedding_model = $1
+        """, config.EMBEDDING_MODEL)
+        await conn.execute("""
+            INSERT INTO embedding_projections
+                (embedding_model, method, dimension, mean, components, explained_variance)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT (embedding_model) DO UPDATE SET
+                method = EXCLUDED.method,
+                dimension = EXCLUDED.dimension,
+                mean = EXCLUDED.mean,
+                components = EXCLUDED.components,
+                explained_variance = EXCLUDED.explained_variance,
+                created_at = NOW()
+        """, config.EMBEDDING_MODEL, method, dimension, mean.tolist(), components.ravel().tolist(), explained)
+        index_seconds = await create_hnsw_index(
+            conn, REDUCED_INDEX, f"(embedding_reduced::vector({dimension}))", 'vector_cosine_ops'
+        )
+
+    elapsed = time.time() - start_time
+    variance = f", {100 * explained:.1f}% of variance kept" if explained is not None else ""
+    logger.log(
+        f"✓ Stored {len(recipe_ids)} reduced vectors ({dimension} dimensions{variance}; "
+        f"index built in {index_seconds:.1f}s, {elapsed:.1f}s total)",
+        force=True
+    )
+
+
+async def clear_reduced_embeddings(conn: asyncpg.Connection):
+    """Remove reduced vectors, their index and the projection (REDUCED_DIMENSION=0 or too few embeddings)."""
+    if not await conn.fetchval(
+        "SELECT EXISTS (SELECT 1 FROM embedding_projections WHERE embedding_model = $1)", config.EMBEDDING_MODEL
+    ):
+        return
+    async with conn.transaction():
+        await drop_vector_index(conn, REDUCED_INDEX)
+        await conn.execute("UPDATE recipe_embeddings SET embedding_reduced = NULL WHERE embedding_reduced IS NOT NULL")
+        await conn.execute("DELETE FROM embedding_projections WHERE embedding_model = $1", config.EMBEDDING_MODEL)
+    logger.log("✓ Removed reduced vectors and projection", force=True)
+
+
+def parse_version(version: str) -> Tuple[int, ...]:
+    """Parse a dotted extension version such as '0.8.0' into a comparable tuple."""
+    return tuple(int(part) for part in re.findall(r'\d+', version))
+
+
+def log_rate(label: str, meter: StageMeter, unit: str):
+    """Log count, duration and throughput of a stage."""
+    logger.log(
+        f"  {label}: {meter.count} {unit} in {meter.seconds:.2f}s ({meter.rate:.1f} {unit}/s)",
+        force=True
+    )
+
+
+async def run_pipeline(mode: str = 'all', resume: bool = False):
+    """
+    Run the ingestion pipeline.
+
+    Args:
+        mode: 'docs' (stage 3), 'embeddings' (stage 3b) or 'all' (single pass)
+        resume: Continue from the staging tables left by an interrupted run
+    """
+    with_docs = mode in ('docs', 'all')
+    with_embeddings = mode in ('embeddings', 'all')
+
+    logger.print_stage_header(STAGE_TITLES[mode])
+
+    # Verify inputs exist
+    if with_docs and not RECIPES_DIR.exists():
+        logger.log(f"✗ Error: Recipes directory not found: {RECIPES_DIR}", force=True)
+        logger.log(f"  Run 02-generate-docs.sh first", force=True)
+        sys.exit(1)
+
+    if with_embeddings and not METADATA_FILE.exists():
+        logger.log(f"✗ Error: Metadata file not found: {METADATA_FILE}", force=True)
+        logger.log(f"  Run 02b-generate-structured-data.sh first", force=True)
+        sys.exit(1)
+
+    # Only names are kept here; entries are streamed from the file again when embedding
+    logger.log(f"→ Scanning recipe metadata...", force=True)
+    metadata_names = [m['name'] for m in iter_metadata() if m.get('name')]
+    if metadata_names:
+        logger.log(f"✓ Found {len(metadata_names)} recipes in {METADATA_FILE.name}", force=True)
+    else:
+        logger.log(f"⚠ Metadata file not found: {METADATA_FILE}", force=True)
+        logger.log(f"  Recipe names will be resolved from markdown only (run 02b-generate-structured-data.sh)", force=True)
+
+    # Test database connection
+    logger.log(f"→ Testing database connection...", force=True)
+    if not await test_db_connection(config, logger):
+        logger.log(f"  Database is not running or not initialized.", force=True)
+        logger.log(f"  Run 00-init-database.sh first to initialize the database.", force=True)
+        sys.exit(1)
+    logger.log(f"✓ Database connection successful", force=True)
+
+    conn = await get_db_connection(config)
+    embeddings_conn = None
+    encoder_pool = None
+    cache = None
+    checkpoint_open = False
+
+    try:
+        model = None
+        existing_hashes = {}
+        if with_embeddings:
+            # Verify pgvector extension is installed
+            vector_version = await conn.fetchval("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            if not vector_version:
+                logger.log(f"✗ ERROR: pgvector extension not found!", force=True)
+                logger.log(f"  Run 00-init-database.sh to initialize the database with pgvector", force=True)
+                sys.exit(1)
+            logger.log(f"✓ pgvector extension installed (version: {vector_version})", force=True)
+            if config.VECTOR_QUANTIZATION not in VECTOR_INDEX_KEYS:
+                logger.log(f"✗ ERROR: Unknown VECTOR_QUANTIZATION: {config.VECTOR_QUANTIZATION}", force=True)
+                logger.log(f"  Use one of: {', '.join(VECTOR_INDEX_KEYS)}", force=True)
+                sys.exit(1)
+            if config.REDUCTION_METHOD not in REDUCTION_METHODS:
+                logger.log(f"✗ ERROR: Unknown REDUCTION_METHOD: {config.REDUCTION_METHOD}", force=True)
+                logger.log(f"  Use one of: {', '.join(REDUCTION_METHODS)}", force=True)
+                sys.exit(1)
+            if not 0 <= config.REDUCED_DIMENSION < config.EMBEDDING_DIMENSION:
+                logger.log(
+                    f"✗ ERROR: REDUCED_DIMENSION must be between 0 (disabled) and "
+                    f"{config.EMBEDDING_DIMENSION - 1}, got {config.REDUCED_DIMENSION}",
+                    force=True
+                )
+                sys.exit(1)
+            if (config.VECTOR_QUANTIZATION != 'none'
+                    and parse_version(vector_version) < QUANTIZATION_MIN_PGVECTOR):
+                logger.log(
+                    f"✗ ERROR: VECTOR_QUANTIZATION={config.VECTOR_QUANTIZATION} needs pgvector "
+                    f"{'.'.join(map(str, QUANTIZATION_MIN_PGVECTOR))} or later",
+                    force=True
+                )
+                sys.exit(1)
+
+            # The in-process model also provides the tokenizer for length sorting
+            model = load_embedding_model()
+            encoder_pool = create_encoder_pool()
+            cache = open_embedding_cache(
+                config.EMBEDDING_CACHE_PATH, config.EMBEDDING_MODEL, config.EMBEDDING_DIMENSION, logger
+            )
+
+            # Hashes of already embedded texts; unchanged recipes are not re-encoded
+            existing_hashes = await load_embedding_text_hashes(
+                conn, metadata_names
+            )
+            stored_count = sum(1 for text_hash in existing_hashes.values() if text_hash is not None)
+            logger.log(
+                f"✓ Resolved {len(existing_hashes)} metadata recipes in the database "
+                f"({stored_count} with stored embeddings for '{config.EMBEDDING_MODEL}')",
+                force=True
+            )
+
+        markdown_files = []
+        if with_docs:
+            # Collect all markdown files (excluding README.md files)
+            logger.log(f"→ Scanning for markdown files...", force=True)
+            all_markdown_files = list(RECIPES_DIR.rglob('*.md'))
+            markdown_files = [f for f in all_markdown_files if f.name != 'README.md']
+            excluded_count = len(all_markdown_files) - len(markdown_files)
+            logger.log(f"✓ Found {len(markdown_files)} markdown files (excluded {excluded_count} README.md files)", force=True)
+
+            if not markdown_files:
+                logger.log(f"✗ Error: No markdown files found in {RECIPES_DIR}", force=True)
+                sys.exit(1)
+
+        logger.log("", force=True)
+        staged = await start_or_resume(conn, mode, resume)
+        checkpoint_open = True
+
+        # File order is the position in the sorted file list, stable across resumed runs
+        numbered_files = [
+            (file_order, path)
+            for file_order, path in enumerate(sorted(markdown_files))
+            if str(path.relative_to(RECIPES_DIR)) not in staged['docs']
+        ]
+
+        meters = {
+            name: StageMeter(name)
+            for name, enabled in (
+                ('parse', with_docs), ('write docs', with_docs),
+                ('embed', with_embeddings), ('write embeddings', with_embeddings)
+            )
+            if enabled
+        }
+        errors = []
+        resolved_counts = {'index': 0, 'markdown': 0}
+        embed_counts = {'changed': 0, 'unchanged': 0, 'skipped': 0, 'no_metadata': 0,
+                        'resumed': len(staged['embeddings']), 'cache_hits': 0, 'cache_misses': 0}
+        stages = []
+        name_queue = None
+
+        if with_docs:
+            # Index recipe names by normalized path for O(1) resolution per file
+            name_index = build_recipe_name_index(metadata_names)
+            logger.log(f"✓ Indexed {len(name_index)} recipe path keys", force=True)
+
+            docs_queue = asyncio.Queue(maxsize=config.PARSE_QUEUE_SIZE)
+            if with_embeddings:
+                name_queue = asyncio.Queue(maxsize=config.PARSE_QUEUE_SIZE)
+            stages += [
+                (produce_recipe_rows(
+                    numbered_files, name_index, docs_queue, errors,
+                    resolved_counts, meters['parse'], name_queue
+                ), meters['parse']),
+                (copy_stream(
+                    conn, DOCS_STAGING_TABLE, DOCS_STAGING_COLUMNS, docs_queue, meters['write docs']
+                ), meters['write docs'])
+            ]
+
+        if with_embeddings:
+            if with_docs:
+                # Embeddings follow the parsed recipes, so entries are looked up
+                # by name (compacted); their COPY needs its own connection
+                metadata_by_name = {m['name']: compact_metadata(m) for m in iter_metadata() if m.get('name')}
+                source = metadata_for_parsed_recipes(
+                    name_queue, metadata_by_name, embed_counts,
+                    staged['docs'].values(), staged['embeddings']
+                )
+                embeddings_conn = await get_db_connection(config)
+            else:
+                known_names = set(existing_hashes)
+                source = metadata_for_known_recipes(iter_metadata(), known_names, embed_counts, staged['embeddings'])
+                embeddings_conn = conn
+                embedding_total = sum(
+                    1 for name in metadata_names
+                    if name in known_names and name not in staged['embeddings']
+                )
+
+            embeddings_queue = asyncio.Queue(maxsize=config.PARSE_QUEUE_SIZE)
+            stages += [
+                (embed_recipes(
+                    source, model, existing_hashes, embeddings_queue, embed_counts,
+                    meters['embed'], staged['next_item_order'], encoder_pool, cache
+                ), meters['embed']),
+                (copy_stream(
+                    embeddings_conn, EMBEDDINGS_STAGING_TABLE, EMBEDDINGS_STAGING_COLUMNS,
+                    embeddings_queue, meters['write embeddings']
+                ), meters['write embeddings'])
+            ]
+
+        if with_docs:
+            logger.log(f"→ Parsing with {config.PARSE_WORKERS} workers and streaming into staging tables...", force=True)
+            progress_bar = tqdm(total=len(numbered_files), desc="Ingesting", unit="recipe")
+            driver = meters['parse']
+        else:
+            logger.log(
+                f"→ Embedding in length-sorted batches of {config.EMBED_BATCH_SIZE} and streaming into staging table...",
+                force=True
+            )
+            progress_bar = tqdm(total=embedding_total, desc="Generating embeddings", unit="recipe")
+            driver = meters['embed']
+
+        await run_stages(stages, progress_bar, driver)
+
+        # Merge everything in one transaction so readers never see a partial
+        # update; the checkpoint is dropped in the same transaction. Pruning is
+        # skipped when files failed to parse, since their recipes would be lost.
+        logger.log(f"→ Merging staging tables...", force=True)
+        if errors:
+            logger.log(f"⚠ Not pruning vanished recipes: {len(errors)} files failed to parse", force=True)
+        merge_start = time.perf_counter()
+        index_rebuild = None
+        index_seconds = 0.0
+        async with conn.transaction():
+            docs_stats = await merge_docs(conn, prune=not errors) if with_docs else None
+            if with_embeddings:
+                # Large loads go in without the HNSW index, which is then built once
+                index_rebuild = await vector_index_rebuild_reason(conn)
+                if index_rebuild:
+                    await drop_vector_index(conn)
+                embeddings_stats = await merge_embeddings(conn, prune=not errors)
+                if index_rebuild:
+                    index_seconds = await build_vector_index(conn)
+            await drop_staging_tables(conn)
+        checkpoint_open = False
+        merge_seconds = time.perf_counter() - merge_start - index_seconds
+
+        if with_docs and with_embeddings:
+            # Metadata entries without a markdown file
+            embed_counts['skipped'] = len(set(metadata_names)) - (
+                embed_counts['changed'] + embed_counts['unchanged'] + embed_counts['resumed']
+            )
+
+        total_in_db = await conn.fetchval("SELECT COUNT(*) FROM recipes")
+
+        logger.log("", force=True)
+        logger.log("========================================", force=True)
+        logger.log("Summary", force=True)
+        logger.log("========================================", force=True)
+
+        if with_docs:
+            logger.log(f"Processed: {len(markdown_files)} files", force=True)
+            logger.log(f"Ingested successfully: {len(markdown_files) - len(errors)}", force=True)
+            if staged['docs']:
+                logger.log(f"  Resumed from checkpoint: {len(staged['docs'])}", force=True)
+            logger.log(f"  Names resolved by index: {resolved_counts['index']}", force=True)
+            logger.log(f"  Names resolved by markdown scan: {resolved_counts['markdown']}", force=True)
+            logger.log(f"Skipped (unresolved or unreadable): {len(errors)}", force=True)
+            logger.log(f"Total recipes in database: {total_in_db}", force=True)
+            logger.log(
+                f"Recipes changed: {docs_stats['added'] + docs_stats['updated']} "
+                f"({docs_stats['added']} new, {docs_stats['updated']} updated), "
+                f"unchanged: {docs_stats['unchanged']}, deleted: {docs_stats['deleted']}",
+                force=True
+            )
+
+        if with_embeddings:
+            logger.log(
+                f"Embeddings changed (re-encoded): {embed_counts['changed']}, "
+                f"unchanged: {embed_counts['unchanged']}, deleted: {embeddings_stats['deleted']}",
+                force=True
+            )
+            if embed_counts['resumed']:
+                logger.log(f"  Resumed from checkpoint: {embed_counts['resumed']}", force=True)
+            if cache is not None:
+                lookups = embed_counts['cache_hits'] + embed_counts['cache_misses']
+                logger.log(
+                    f"  From embedding cache: {embed_counts['cache_hits']} of {lookups} "
+                    f"({100 * embed_counts['cache_hits'] / max(lookups, 1):.1f}% hit rate), "
+                    f"encoded: {embed_counts['cache_misses']}",
+                    force=True
+                )
+            logger.log(f"Skipped metadata entries (recipe not in DB): {embed_counts['skipped']}", force=True)
+            if with_docs:
+                logger.log(f"Recipes without metadata: {embed_counts['no_metadata']}", force=True)
+
+        logger.log("", force=True)
+        logger.log("Throughput:", force=True)
+        if with_docs:
+            log_rate("parse", meters['parse'], "files")
+            log_rate("write docs (COPY)", meters['write docs'], "rows")
+        if with_embeddings:
+            log_rate("embed", meters['embed'], "recipes")
+            log_rate("write embeddings (COPY)", meters['write embeddings'], "rows")
+        logger.log(f"  merge: {merge_seconds:.2f}s", force=True)
+        if index_rebuild:
+            logger.log(f"  HNSW index build: {index_seconds:.2f}s", force=True)
+
+        if errors:
+            logger.log(f"", force=True)
+            logger.log(f"Unresolved files:", force=True)
+            for filename, error in errors[:10]:  # Show first 10 errors
+                logger.log(f"  - {filename}: {error}", force=True)
+            if len(errors) > 10:
+                logger.log(f"  ... and {len(errors) - 10} more", force=True)
+
+        if with_embeddings:
+            embedding_count = await conn.fetchval(
+                "SELECT COUNT(*) FROM recipe_embeddings WHERE embedding_model = $1",
+                config.EMBEDDING_MODEL
+            )
+            logger.log("", force=True)
+            logger.log(f"✓ Embeddings in database for model '{config.EMBEDDING_MODEL}': {embedding_count}", force=True)
+
+            index = await vector_index_state(conn)
+            index_size = await conn.fetchval("SELECT pg_size_pretty($1::bigint)", index['size'])
+            if index_rebuild:
+                logger.log(
+                    f"✓ HNSW index rebuilt in {index_seconds:.1f}s ({index_rebuild}): "
+                    f"{index_size}, {index['opclass']}, {', '.join(index['options'])}",
+                    force=True
+                )
+            else:
+                logger.log(
+                    f"✓ HNSW index updated incrementally: {index_size}, {index['opclass']}, "
+                    f"{', '.join(index['options'])}",
+                    force=True
+                )
+
+            # Precompute related recipes for the similar_recipes tool. Recipe
+            # deletions cascade into neighbor lists, so they are also rebuilt
+            # when the stored link count no longer matches.
+            logger.log("", force=True)
+            if (embeddings_stats['written'] or embeddings_stats['deleted']
+                    or not await recipe_neighbors_complete(conn, config.NEIGHBORS_TOP_N)):
+                await store_recipe_neighbors(conn, config.NEIGHBORS_TOP_N)
+            else:
+                logger.log(f"✓ Related recipes up to date (no embeddings changed)", force=True)
+
+            # Low-dimensional first-stage vectors for search; the projection is
+            # refitted whenever embeddings change, like the neighbor lists
+            if config.REDUCED_DIMENSION:
+                if (embeddings_stats['written'] or embeddings_stats['deleted']
+                        or not await reduced_embeddings_current(conn)):
+                    await store_reduced_embeddings(conn)
+                else:
+                    logger.log(f"✓ Reduced vectors up to date (no embeddings changed)", force=True)
+            else:
+                await clear_reduced_embeddings(conn)
+
+    except BaseException:
+        if checkpoint_open:
+            # Committed batches stay in the staging tables
+            logger.log(f"", force=True)
+            logger.log(f"✗ Ingestion interrupted; committed batches are kept in the staging tables", force=True)
+            logger.log(f"  Rerun with --resume to continue where it stopped", force=True)
+        raise
+
+    finally:
+        if encoder_pool is not None:
+            encoder_pool.shutdown(cancel_futures=True)
+        if cache is not None:
+            cache.close()
+        if embeddings_conn is not None and embeddings_conn is not conn:
+            await embeddings_conn.close()
+        await conn.close()
+
+    if mode == 'docs':
+        logger.print_stage_footer("3", "Run 03b-generate-embeddings.py")
+    elif mode == 'embeddings':
+        logger.print_stage_footer("3b", "Run 04-create-image.sh")
+    else:
+        logger.print_stage_footer("3", "Run 04-create-image.sh")
+
+
+def main(mode: Optional[str] = None):
+    """
+    Main function.
+
+    Args:
+        mode: Fixed pipeline mode of a wrapper script (None = take it from --mode)
+    """
+    parser = argparse.ArgumentParser(description=STAGE_TITLES[mode or 'all'])
+    if mode is None:
+        parser.add_argument('--mode', choices=['all', 'docs', 'embeddings'], default='all',
+                            help="all: single pass (default); docs: stage 3 only; embeddings: stage 3b only")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from the staging tables left by an interrupted run")
+    args = parser.parse_args()
+    asyncio.run(run_pipeline(mode or args.mode, resume=args.resume))
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,36 @@ source "$COMMON_LIB"
 # Initialize script environment
 init_script
 
+# Parse command line arguments
+INIT_DB_ARGS=()
+INGEST_ARGS=()
+RESUME=false
+while [[ $# -gt 0 ]]; do
+    case $1 in
+        --reset)
+            INIT_DB_ARGS+=("--reset")
+            shift
+            ;;
+        --resume)
+            INGEST_ARGS+=("--resume")
+            RESUME=true
+            shift
+            ;;
+        *)
+            log_error "Unknown option: $1"
+            echo "Usage: $0 [--reset | --resume]"
+            echo "  --reset: Recreate the database from scratch instead of updating it incrementally"
+            echo "  --resume: Continue an interrupted stage 3 in the existing shadow schema"
+            exit 1
+            ;;
+    esac
+done
+
+if [ "$RESUME" = true ] && [ ${#INIT_DB_ARGS[@]} -gt 0 ]; then
+    log_error "--reset and --resume cannot be combined"
+    exit 1
+fi
+
 # Check if .env exists, if not copy from .env.example
 if [ ! -f "$PROJECT_DIR/.env" ]; then
     if [ -f "$PROJECT_DIR/.env.example" ]; then
@@ -43,7 +73,9 @@ STAGES_COMPLETED=()
 echo ""
 log_info "Stage 0/7: Initialize Database"
 echo "────────────────────────────────────────────────────────────"
-if "$SCRIPT_DIR/00-init-database.sh" --reset; then
+# Without --reset the existing database is kept: stages 3 and 3b only rewrite
+# changed recipes and prune the ones that vanished
+if "$SCRIPT_DIR/00-init-database.sh" ${INIT_DB_ARGS[@]+"${INIT_DB_ARGS[@]}"}; then
     STAGES_COMPLETED+=("Stage 0: Initialize Database")
     log_success "Stage 0 completed"
 else
@@ -88,10 +120,11 @@ else
     exit 1
 fi
 
-# Stage 3: Ingest to Database
+# Stage 3: Ingest docs, metadata and embeddings in a single streaming pass
 echo ""
-log_info "Stage 3/7: Ingest Documentation to Database"
+log_info "Stage 3/7: Ingest Documentation, Metadata and Embeddings"
 echo "────────────────────────────────────────────────────────────"
+log_warning "First run will download embedding model (~90MB)"
 
 # Check if Python venv exists, if not create it
 if [ ! -d "$PROJECT_DIR/venv" ]; then
@@ -105,8 +138,20 @@ log_info "Installing Python dependencies..."
 source "$PROJECT_DIR/venv/bin/activate"
 pip install -q -r "$PROJECT_DIR/requirements.txt"
 
-if python3 "$SCRIPT_DIR/03-ingest-docs.py"; then
-    STAGES_COMPLETED+=("Stage 3: Ingest Data")
+# The new version is built in a shadow schema; the live tables are only
+# replaced by the atomic swap afterwards
+SHADOW_SCHEMA="${SHADOW_SCHEMA:-recipes_shadow}"
+if [ "$RESUME" = true ]; then
+    # Keep the shadow schema and the checkpoint of the interrupted run
+    log_info "Resuming ingestion in shadow schema '$SHADOW_SCHEMA'"
+elif ! python3 "$SCRIPT_DIR/03c-swap-schema.py" prepare; then
+    log_error "Failed to prepare shadow schema"
+    deactivate
+    exit 1
+fi
+
+if DB_SCHEMA="$SHADOW_SCHEMA" python3 "$SCRIPT_DIR/ingest_pipeline.py" ${INGEST_ARGS[@]+"${INGEST_ARGS[@]}"}; then
+    STAGES_COMPLETED+=("Stage 3: Ingest Data and Embeddings")
     log_success "Stage 3 completed"
 else
     log_error "Stage 3 failed"
@@ -114,17 +159,15 @@ else
     exit 1
 fi
 
-# Stage 3b: Generate Embeddings (Phase 3)
+# Stage 3c: Swap the shadow schema live
 echo ""
-log_info "Stage 3b/7: Generate Recipe Embeddings"
+log_info "Stage 3c/7: Swap New Data Version Live"
 echo "────────────────────────────────────────────────────────────"
-log_warning "First run will download embedding model (~90MB)"
-
-if python3 "$SCRIPT_DIR/03b-generate-embeddings.py"; then
-    STAGES_COMPLETED+=("Stage 3b: Generate Embeddings")
-    log_success "Stage 3b completed"
+if python3 "$SCRIPT_DIR/03c-swap-schema.py" swap; then
+    STAGES_COMPLETED+=("Stage 3c: Swap Schema")
+    log_success "Stage 3c completed"
 else
-    log_error "Stage 3b failed"
+    log_error "Stage 3c failed"
     deactivate
     exit 1
 fi
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Recall@k report of two-stage search against exact search.
+
+Runs the same queries through find_recipes' semantic search once per
+first-stage mode (VECTOR_QUANTIZATION halfvec and binary, and reduced
+vectors when a projection is stored) and compares each top-k to the exact
+top-k (mode 'none', every embedding scored with full vectors):
+
+    recall@k = |two-stage top-k ∩ exact top-k| / |exact top-k|
+
+Queries are recipe descriptions sampled from the database, or intents read
+from a file (one per line). A quantized mode is only served by an HNSW index
+if the database was built with that VECTOR_QUANTIZATION; otherwise its first
+stage scans the quantized distances and the report measures quantization loss
+alone.
+
+Usage:
+    python scripts/recall-report.py [--k 10] [--queries 200] [--candidates 100]
+    python scripts/recall-report.py --queries-file intents.txt
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from config import config
+from db.connection import init_pool, close_pool, get_connection
+from db.projection import load_embedding_projection
+from db.queries import encode_intents, find_recipes_by_semantic_search
+
+QUANTIZED_MODES = {'halfvec': 'halfvec_cosine_ops', 'binary': 'bit_hamming_ops'}
+
+# Index built by the ingestion pipeline for VECTOR_QUANTIZATION
+VECTOR_INDEX = 'idx_recipe_embeddings_vector'
+
+
+async def sample_descriptions(count: int) -> List[str]:
+    """Sample recipe descriptions (repeatable order) to use as queries."""
+    async with get_connection() as conn, conn.transaction():
+        await conn.execute("SELECT setseed(0.5)")
+        rows = await conn.fetch("""
+            SELECT description FROM recipe_metadata
+            WHERE description IS NOT NULL AND description <> ''
+            ORDER BY random()
+            LIMIT $1
+        """, count)
+    return [r['description'] for r in rows]
+
+
+async def indexed_opclass() -> Optional[str]:
+    """Operator class of the full-vector HNSW index (not the reduced one), if any."""
+    async with get_connection() as conn:
+        return await conn.fetchval("""
+            SELECT opc.opcname
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_opclass opc ON opc.oid = x.indclass[0]
+            WHERE x.indrelid = 'recipe_embeddings'::regclass AND i.relname = $1
+        """, VECTOR_INDEX)
+
+
+async def search_all(embeddings, k: int, first_stage: str):
+    """Run one search per query; return top-k recipe ids per query and mean latency."""
+    results = []
+    start = time.perf_counter()
+    for embedding in embeddings:
+        recipes = await find_recipes_by_semantic_search(
+            intent='', limit=k, embedding=embedding, first_stage=first_stage
+        )
+        results.append([r['recipe_id'] for r in recipes])
+    return results, (time.perf_counter() - start) / max(len(embeddings), 1)
+
+
+async def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Recall@k of two-stage search against exact search")
+    parser.add_argument('--k', type=int, default=10, help="results compared per query (default: 10)")
+    parser.add_argument('--queries', type=int, default=200, help="sampled queries (default: 200)")
+    parser.add_argument('--queries-file', type=Path, help="file with one query per line")
+    parser.add_argument('--candidates', type=int, default=config.RERANK_CANDIDATES,
+                        help=f"first-stage candidates (default: RERANK_CANDIDATES={config.RERANK_CANDIDATES})")
+    args = parser.parse_args()
+
+    config.RERANK_CANDIDATES = args.candidates
+    await init_pool(
+        host=config.DB_HOST,
+        port=config.DB_PORT,
+        database=config.DB_NAME,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD
+    )
+    try:
+        if args.queries_file:
+            intents = [line.strip() for line in args.queries_file.read_text(encoding='utf-8').splitlines()]
+            intents = [intent for intent in intents if intent]
+        else:
+            intents = await sample_descriptions(args.queries)
+        if not intents:
+            print("No queries to run", file=sys.stderr)
+            sys.exit(1)
+
+        embeddings = encode_intents(intents)
+        opclass = await indexed_opclass()
+        projection = await load_embedding_projection()
+
+        first_stages = {
+            mode: 'HNSW index' if opclass == mode_opclass else 'scan (no index)'
+            for mode, mode_opclass in QUANTIZED_MODES.items()
+        }
+        if projection is not None:
+            first_stages['reduced'] = f"HNSW index ({projection.dimension} dims)"
+
+        exact, exact_latency = await search_all(embeddings, args.k, 'none')
+        print(f"Recall@{args.k} over {len(intents)} queries, {args.candidates} re-ranked candidates")
+        print(f"  {'mode':<8} {'first stage':<22} {'recall':>7} {'latency':>10}")
+        print(f"  {'none':<8} {'exact scan':<22} {1:>7.3f} {exact_latency * 1000:>8.1f}ms")
+
+        for mode, first_stage in first_stages.items():
+            found, latency = await search_all(embeddings, args.k, mode)
+            hits = sum(len(set(f) & set(e)) for f, e in zip(found, exact))
+            total = sum(len(e) for e in exact)
+            print(f"  {mode:<8} {first_stage:<22} {hits / max(total, 1):>7.3f} {latency * 1000:>8.1f}ms")
+    finally:
+        await close_pool()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
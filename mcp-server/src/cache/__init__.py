@@ -0,0 +1 @@
+"""Caching layers for search results."""
@@ -0,0 +1,79 @@
+"""In-memory store of ranked candidate lists for find_recipes pagination.
+
+The first find_recipes call ranks a window of candidates and returns one page.
+The remaining candidates are kept here under an opaque cursor, so follow-up
+pages are served from memory without re-encoding the intent or re-running
+the vector search.
+"""
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Global store instance (created on first use)
+_store: Optional["CursorStore"] = None
+
+
+class CursorStore:
+    """Bounded, TTL-expiring store of ranked candidate lists."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict], Dict]]" = OrderedDict()
+
+    def put(self, candidates: List[Dict], search_info: Dict) -> str:
+        """Store a ranked candidate list and return its token."""
+        self._expire()
+        token = secrets.token_urlsafe(12)
+        self._entries[token] = (time.monotonic() + self.ttl_seconds, candidates, search_info)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return token
+
+    def get(self, token: str) -> Optional[Tuple[List[Dict], Dict]]:
+        """Return (candidates, search_info) for a token, or None if unknown or expired."""
+        self._expire()
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        self._entries.move_to_end(token)
+        return entry[1], entry[2]
+
+    def _expire(self):
+        """Drop entries whose TTL has passed."""
+        now = time.monotonic()
+        expired = [token for token, entry in self._entries.items() if entry[0] <= now]
+        for token in expired:
+            del self._entries[token]
+
+
+def get_cursor_store() -> CursorStore:
+    """Get the cursor store, creating it from config on first use."""
+    global _store
+    if _store is None:
+        _store = CursorStore(config.CURSOR_MAX_ENTRIES, config.CURSOR_TTL_SECONDS)
+    return _store
+
+
+def encode_cursor(token: str, offset: int) -> str:
+    """Build the opaque cursor returned to clients."""
+    return f"{token}.{offset}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Split a cursor into store token and page offset.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    token, _, offset = cursor.rpartition('.')
+    if not token or not offset.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return token, int(offset)
@@ -0,0 +1,154 @@
+"""Persistent on-disk cache for find_recipes results.
+
+Results are stored in a local SQLite file so that repeated queries survive
+server restarts (e.g. several evaluation runs against the same database image).
+Every entry is keyed by the normalized query parameters plus a fingerprint of
+the ingested index and the cache format version, so neither a new database
+image nor an older cache file ever serves stale results.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Version of the cached value layout; bump it when the stored value changes
+# shape so cache files written by an older server are cleared on startup
+CACHE_FORMAT_VERSION = 2
+
+# Global cache instance (None when the cache is disabled)
+_cache: Optional["ResultCache"] = None
+
+
+class ResultCache:
+    """Size-bounded SQLite cache with least-recently-used eviction."""
+
+    def __init__(self, path: str, max_entries: int, fingerprint: str):
+        self.path = path
+        self.max_entries = max_entries
+        self.fingerprint = f"v{CACHE_FORMAT_VERSION}:{fingerprint}"
+
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_results_accessed_at ON results(accessed_at)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_meta (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+        self._invalidate_if_index_changed()
+
+    def _invalidate_if_index_changed(self):
+        """Drop all entries when the cache was filled from a different index."""
+        row = self._conn.execute(
+            "SELECT value FROM cache_meta WHERE name = 'fingerprint'"
+        ).fetchone()
+        if row and row[0] == self.fingerprint:
+            return
+
+        if row:
+            logger.info("Index fingerprint changed, clearing result cache")
+        self._conn.execute("DELETE FROM results")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache_meta (name, value) VALUES ('fingerprint', ?)",
+            (self.fingerprint,)
+        )
+
+    def make_key(self, params: Dict[str, Any]) -> str:
+        """Build a cache key from normalized query parameters and the index fingerprint."""
+        payload = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(f"{self.fingerprint}:{payload}".encode('utf-8')).hexdigest()
+
+    def get(self, params: Dict[str, Any]) -> Optional[Any]:
+        """Return the cached value for params, or None on a miss."""
+        key = self.make_key(params)
+        try:
+            row = self._conn.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE results SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache read failed: {e}")
+            return None
+
+    def put(self, params: Dict[str, Any], value: Any):
+        """Store value for params and evict least recently used entries over the bound."""
+        key = self.make_key(params)
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, accessed_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, separators=(',', ':')), time.time())
+            )
+            self._evict()
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache write failed: {e}")
+
+    def _evict(self):
+        """Delete the oldest entries so that at most max_entries remain."""
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute("""
+                DELETE FROM results WHERE key IN (
+                    SELECT key FROM results ORDER BY accessed_at ASC LIMIT ?
+                )
+            """, (overflow,))
+            logger.debug(f"Evicted {overflow} result cache entries")
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        self._conn.close()
+
+
+def init_result_cache(path: str, max_entries: int, fingerprint: str) -> Optional[ResultCache]:
+    """
+    Initialize the persistent result cache.
+
+    Cache failures are never fatal: if the file cannot be opened the server
+    keeps running without a cache.
+    """
+    global _cache
+
+    if _cache is not None:
+        logger.warning("Result cache already initialized")
+        return _cache
+
+    try:
+        _cache = ResultCache(path, max_entries, fingerprint)
+        logger.info(f"Result cache initialized (path={path}, max_entries={max_entries})")
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to initialize result cache at {path}: {e}")
+        _cache = None
+    return _cache
+
+
+def close_result_cache():
+    """Close the result cache if it was initialized."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+        logger.info("Result cache closed")
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Get the result cache, or None when caching is disabled."""
+    return _cache
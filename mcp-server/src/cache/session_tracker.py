@@ -0,0 +1,104 @@
+"""Session-scoped tracking of payloads already delivered to the client.
+
+The server talks to exactly one client over stdio, so process state is
+connection state. When session deduplication is enabled, recipe summaries and
+documents that were already returned in this session are replaced by short
+references in later responses. Deliveries are recorded per field from the
+final, shaped response, so content dropped or truncated for max_bytes or left
+out by 'fields' is sent in full later.
+"""
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Global tracker instance (None when session deduplication is disabled)
+_tracker: Optional["SessionTracker"] = None
+
+# Recipe entry fields replaced by a reference once delivered
+SUMMARY_FIELDS = ('name', 'description', 'tags')
+
+
+class SessionTracker:
+    """Remembers content hashes of payload fields delivered on this connection."""
+
+    def __init__(self):
+        self._delivered: Dict[Tuple[str, str, str], str] = {}
+
+    @staticmethod
+    def _digest(content: Any) -> str:
+        payload = json.dumps(content, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def was_delivered(self, kind: str, key: str, content: Dict[str, Any]) -> bool:
+        """
+        Report whether every field of content was delivered before unchanged.
+
+        Args:
+            kind: Payload kind ('summary' or 'document')
+            key: Recipe id
+            content: Payload fields about to be delivered
+
+        Returns:
+            True if content is non-empty and each field was delivered with the same value
+        """
+        return bool(content) and all(
+            self._delivered.get((kind, key, field)) == self._digest(value)
+            for field, value in content.items()
+        )
+
+    def record(self, kind: str, key: str, content: Dict[str, Any]):
+        """
+        Record payload fields as delivered.
+
+        Only record what the final response contains: a shortened description
+        or document is recorded as such and does not count as the full text.
+
+        Args:
+            kind: Payload kind ('summary' or 'document')
+            key: Recipe id
+            content: Payload fields delivered to the client
+        """
+        for field, value in content.items():
+            self._delivered[(kind, key, field)] = self._digest(value)
+
+    def shorten_summary(self, recipe_id: str, entry: Dict, force_full: bool = False) -> Dict:
+        """
+        Replace an already delivered recipe summary with a reference.
+
+        Delivery is not recorded here; see record_summary.
+
+        Args:
+            recipe_id: Recipe id the entry describes
+            entry: Response entry containing SUMMARY_FIELDS
+            force_full: Always return the full entry
+
+        Returns:
+            The entry unchanged, or without SUMMARY_FIELDS and with 'seen': True
+        """
+        summary = {field: entry[field] for field in SUMMARY_FIELDS if field in entry}
+        if force_full or not self.was_delivered('summary', recipe_id, summary):
+            return entry
+        shortened = {k: v for k, v in entry.items() if k not in SUMMARY_FIELDS}
+        shortened['seen'] = True
+        return shortened
+
+    def record_summary(self, recipe_id: str, entry: Dict):
+        """Record the SUMMARY_FIELDS of a delivered response entry."""
+        self.record('summary', recipe_id, {field: entry[field] for field in SUMMARY_FIELDS if field in entry})
+
+
+def init_session_tracker() -> SessionTracker:
+    """Enable session deduplication for this connection."""
+    global _tracker
+    if _tracker is None:
+        _tracker = SessionTracker()
+        logger.info("Session response deduplication enabled")
+    return _tracker
+
+
+def get_session_tracker() -> Optional[SessionTracker]:
+    """Get the session tracker, or None when deduplication is disabled."""
+    return _tracker
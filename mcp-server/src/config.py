@@ -23,7 +23,9 @@ class Config:
     DB_PASSWORD: str = os.environ["DB_PASSWORD"]
 
     # Embedding settings (for future phases)
-    EMBEDDING_MODEL: str = os.environ["EMBEDDING_MODEL"]
+    # Key of stored embeddings and projections; the 'sentence-transformers/'
+    # hub prefix is dropped as in the ingestion pipeline
+    EMBEDDING_MODEL: str = os.environ["EMBEDDING_MODEL"].removeprefix("sentence-transformers/")
     EMBEDDING_DIMENSION: int = int(os.environ["EMBEDDING_DIMENSION"])
 
     # Tool settings
@@ -33,6 +35,44 @@ class Config:
     # Multi-query settings
     RRF_CONSTANT: int = 60              # Reciprocal Rank Fusion k constant
     MAX_QUERIES_PER_REQUEST: int = 5    # Maximum query variations per request
+    INTENT_COLLAPSE_THRESHOLD: float = float(os.environ.get("INTENT_COLLAPSE_THRESHOLD", "0.9"))  # Cosine similarity for collapsing variations
+
+    # Pagination settings
+    # Candidates ranked per search for cursor pagination. Exact search scans
+    # every embedding and two-stage searches retrieve at least this many
+    # candidates (raising hnsw.ef_search to match), so the window only bounds
+    # how many results one search ranks and keeps for follow-up pages
+    CURSOR_CANDIDATE_WINDOW: int = int(os.environ.get("CURSOR_CANDIDATE_WINDOW", "40"))
+    CURSOR_TTL_SECONDS: int = int(os.environ.get("CURSOR_TTL_SECONDS", "900"))
+    CURSOR_MAX_ENTRIES: int = int(os.environ.get("CURSOR_MAX_ENTRIES", "200"))
+
+    # Quantized search settings
+    # First-stage index of a two-stage search: none (exact scan), halfvec or
+    # binary; must match VECTOR_QUANTIZATION of the ingestion pipeline
+    VECTOR_QUANTIZATION: str = os.environ.get("VECTOR_QUANTIZATION", "none")
+    # Candidates retrieved from the quantized index and re-ranked with full vectors
+    RERANK_CANDIDATES: int = int(os.environ.get("RERANK_CANDIDATES", "100"))
+    # Retrieve candidates by the dimension-reduced vectors stored by the
+    # ingestion pipeline (REDUCED_DIMENSION); takes precedence over quantization
+    REDUCED_SEARCH: bool = os.environ.get("REDUCED_SEARCH", "false").lower() == "true"
+
+    # Similar recipes settings
+    # Neighbors stored per recipe by the ingestion pipeline; caps similar_recipes' limit
+    NEIGHBORS_TOP_N: int = int(os.environ.get("NEIGHBORS_TOP_N", "10"))
+
+    # Intent tree search settings
+    MAX_TREE_NODES: int = 50            # Maximum intent tree nodes searched per request
+
+    # Response shaping settings
+    DESCRIPTION_TRUNCATE_CHARS: int = 160   # Description length kept when a response exceeds max_bytes
+
+    # Session settings
+    # Replace recipe descriptions/documents already delivered on this connection with references
+    SESSION_DEDUP: bool = os.environ.get("SESSION_DEDUP", "false").lower() == "true"
+
+    # Persistent result cache settings (disabled when path is empty)
+    RESULT_CACHE_PATH: str = os.environ.get("RESULT_CACHE_PATH", "")
+    RESULT_CACHE_MAX_ENTRIES: int = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "5000"))
 
     @classmethod
     def get_db_url(cls) -> str:
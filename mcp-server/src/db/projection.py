@@ -0,0 +1,79 @@
+"""Projection of query embeddings into the reduced search space.
+
+The ingestion pipeline stores a low-dimensional companion of each embedding
+(recipe_embeddings.embedding_reduced) together with the projection that
+produced it. The projection is loaded once at startup so queries are
+transformed the same way without a database round trip.
+"""
+import logging
+from typing import Optional
+
+import asyncpg
+import numpy as np
+
+from config import config
+from db.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Global projection instance (None when reduced search is unavailable)
+_projection: Optional["EmbeddingProjection"] = None
+
+
+class EmbeddingProjection:
+    """Linear map reduced = (embedding - mean) @ components.T."""
+
+    def __init__(self, method: str, mean: np.ndarray, components: np.ndarray):
+        self.method = method
+        self.mean = mean
+        self.components = components
+
+    @property
+    def dimension(self) -> int:
+        return self.components.shape[0]
+
+    def project(self, embedding) -> np.ndarray:
+        """Project one embedding into the reduced space."""
+        return (np.asarray(embedding, dtype=np.float32) - self.mean) @ self.components.T
+
+
+async def load_embedding_projection() -> Optional[EmbeddingProjection]:
+    """
+    Load the projection stored for the configured embedding model.
+
+    This must be called after the database pool is initialized. Returns
+    None when no projection is stored under config.EMBEDDING_MODEL; the
+    server then refuses to start with REDUCED_SEARCH enabled.
+    """
+    global _projection
+
+    async with get_connection() as conn:
+        try:
+            row = await conn.fetchrow("""
+                SELECT method, dimension, mean, components
+                FROM embedding_projections
+                WHERE embedding_model = $1
+            """, config.EMBEDDING_MODEL)
+        except asyncpg.UndefinedTableError:
+            # Database image built before reduced vectors existed
+            row = None
+
+    if row is None:
+        logger.warning(
+            f"No embedding projection stored for '{config.EMBEDDING_MODEL}' "
+            f"(set REDUCED_DIMENSION during ingestion)"
+        )
+        _projection = None
+        return None
+
+    components = np.array(row['components'], dtype=np.float32).reshape(row['dimension'], -1)
+    _projection = EmbeddingProjection(row['method'], np.array(row['mean'], dtype=np.float32), components)
+    logger.info(
+        f"Embedding projection loaded ({row['method']}, {components.shape[1]} -> {row['dimension']} dimensions)"
+    )
+    return _projection
+
+
+def get_embedding_projection() -> Optional[EmbeddingProjection]:
+    """Get the loaded projection, or None when reduced search is unavailable."""
+    return _projection
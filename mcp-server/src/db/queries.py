@@ -1,9 +1,15 @@
 """Database queries for recipes."""
+import hashlib
+import json
 import logging
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
+import asyncpg
+
+from config import config
 from db.connection import get_connection
+from db.projection import get_embedding_projection
 
 logger = logging.getLogger(__name__)
 
@@ -84,10 +90,163 @@ async def find_all_recipes(limit: int = 5) -> List[Dict]:
         ]
 
 
+def encode_intents(intents: List[str]):
+    """
+    Encode query texts in a single model batch.
+
+    Args:
+        intents: Query texts to encode
+
+    Returns:
+        Array of embeddings, one row per intent
+    """
+    model = get_embedding_model()
+    return model.encode(intents, show_progress_bar=False)
+
+
+def to_pgvector(embedding) -> str:
+    """Convert an embedding to PostgreSQL vector literal format."""
+    return '[' + ','.join(str(x) for x in embedding) + ']'
+
+
+def quantized_distance(quantization: str, column: str, query_vector: str) -> str:
+    """
+    Build the first-stage distance expression of a quantization mode.
+
+    Each expression matches the HNSW index the ingestion pipeline builds for
+    its VECTOR_QUANTIZATION setting, so the candidate query is served by it.
+
+    Args:
+        quantization: 'halfvec' or 'binary'
+        column: Full-precision embedding column
+        query_vector: SQL expression of the query vector (type vector)
+
+    Raises:
+        ValueError: If the quantization mode is unknown
+    """
+    dimension = config.EMBEDDING_DIMENSION
+    if quantization == 'halfvec':
+        return f"{column}::halfvec({dimension}) <=> {query_vector}::halfvec({dimension})"
+    if quantization == 'binary':
+        return f"binary_quantize({column})::bit({dimension}) <~> binary_quantize({query_vector})"
+    raise ValueError(f"Unknown vector quantization: {quantization!r}")
+
+
+def default_first_stage() -> str:
+    """
+    First search stage used unless a caller picks one.
+
+    Reduced vectors are used when their projection was loaded at startup
+    (REDUCED_SEARCH), otherwise the configured VECTOR_QUANTIZATION.
+    """
+    if get_embedding_projection() is not None:
+        return 'reduced'
+    return config.VECTOR_QUANTIZATION
+
+
+def first_stage_distance(first_stage: str, query_vector: str, reduced_vector: Optional[str]) -> str:
+    """
+    Build the distance expression candidates are retrieved by.
+
+    Args:
+        first_stage: 'halfvec', 'binary' or 'reduced'
+        query_vector: SQL expression of the query vector (type vector)
+        reduced_vector: SQL expression of the projected query vector ('reduced' only)
+
+    Raises:
+        ValueError: If the mode is unknown or no projection is loaded
+    """
+    if first_stage != 'reduced':
+        return quantized_distance(first_stage, 'embedding', query_vector)
+    projection = get_embedding_projection()
+    if projection is None:
+        raise ValueError("Reduced search needs an embedding projection (REDUCED_SEARCH)")
+    dimension = projection.dimension
+    return f"embedding_reduced::vector({dimension}) <=> {reduced_vector}::vector({dimension})"
+
+
+def embedding_rows(
+    first_stage: str,
+    query_vector: str,
+    candidates: int,
+    reduced_vector: Optional[str] = None
+) -> str:
+    """
+    Build the FROM item (aliased e) of the embeddings scored by a semantic search.
+
+    With first stage 'none' every embedding is scored exactly. Otherwise the
+    search is two-stage: the quantized index or the reduced-vector index
+    retrieves the closest candidates and only those are re-ranked by exact
+    cosine similarity against the full vectors.
+
+    Args:
+        first_stage: 'none', 'halfvec', 'binary' or 'reduced'
+        query_vector: SQL expression of the query vector (type vector)
+        candidates: Number of candidates retrieved in the first stage
+        reduced_vector: SQL expression of the projected query vector ('reduced' only)
+    """
+    if first_stage == 'none':
+        return "recipe_embeddings e"
+    return f"""(
+                SELECT recipe_id, embedding
+                FROM recipe_embeddings
+                ORDER BY {first_stage_distance(first_stage, query_vector, reduced_vector)}
+                LIMIT {int(candidates)}
+            ) e"""
+
+
+async def set_candidate_search_breadth(conn, first_stage: str, candidates: int):
+    """
+    Let one HNSW index scan return all first-stage candidates.
+
+    hnsw.ef_search (default 40) caps the rows a scan returns; it is raised
+    for the current transaction only.
+    """
+    if first_stage != 'none':
+        await conn.execute(
+            "SELECT set_config('hnsw.ef_search', $1, true)", str(min(max(candidates, 40), 1000))
+        )
+
+
+def build_option_filters(
+    has_option: Optional[str],
+    no_required_options: bool,
+    first_param: int
+) -> Tuple[str, List]:
+    """
+    Build SQL conditions filtering recipes by their option schemas.
+
+    Conditions use jsonb containment on recipe_metadata.options so they are
+    served by the GIN index without reading markdown_doc.
+
+    Args:
+        has_option: Only keep recipes that have an option with this name
+        no_required_options: Only keep recipes without required options
+        first_param: Number of the first positional query parameter to use
+
+    Returns:
+        Tuple of (SQL fragment starting with AND, or empty; query parameters)
+    """
+    conditions = []
+    params = []
+    if has_option:
+        params.append(json.dumps([{"name": has_option}]))
+        conditions.append(f"m.options @> ${first_param + len(params) - 1}::jsonb")
+    if no_required_options:
+        conditions.append("""m.options IS NOT NULL AND NOT m.options @> '[{"required": true}]'::jsonb""")
+
+    sql = ''.join(f"\n              AND {c}" for c in conditions)
+    return sql, params
+
+
 async def find_recipes_by_semantic_search(
     intent: str,
     limit: int = 5,
-    min_score: float = 0.0
+    min_score: float = 0.0,
+    embedding=None,
+    has_option: Optional[str] = None,
+    no_required_options: bool = False,
+    first_stage: Optional[str] = None
 ) -> List[Dict]:
     """
     Find recipes using semantic search with vector embeddings.
@@ -98,21 +257,44 @@ async def find_recipes_by_semantic_search(
         intent: User's description of what they want to accomplish
         limit: Maximum number of results to return
         min_score: Minimum similarity score (0.0-1.0) for results
+        embedding: Precomputed embedding of intent (encoded here if omitted)
+        has_option: Only return recipes that have an option with this name
+        no_required_options: Only return recipes without required options
+        first_stage: Candidate retrieval mode: 'none' (exact), 'halfvec',
+            'binary' or 'reduced' (default: default_first_stage()); searches
+            with option filters always use 'none'
 
     Returns:
         List of recipe dictionaries ordered by relevance score
     """
     # Generate embedding for the user's intent
-    model = get_embedding_model()
-    intent_embedding = model.encode(intent, show_progress_bar=False)
+    if embedding is None:
+        model = get_embedding_model()
+        embedding = model.encode(intent, show_progress_bar=False)
 
     # Convert embedding to PostgreSQL vector format
-    embedding_str = '[' + ','.join(str(x) for x in intent_embedding) + ']'
-
-    async with get_connection() as conn:
+    embedding_str = to_pgvector(embedding)
+
+    first_stage = first_stage or default_first_stage()
+    if has_option or no_required_options:
+        # Option filters apply after the first stage and could leave few of
+        # its capped candidates, so filtered searches score every embedding
+        first_stage = 'none'
+    candidates = max(config.RERANK_CANDIDATES, limit)
+    reduced_vector = '$4' if first_stage == 'reduced' else None
+    embedding_source = embedding_rows(first_stage, '$1::vector', candidates, reduced_vector)
+    params = [embedding_str, min_score, limit]
+    if reduced_vector:
+        # The query is projected like the stored reduced vectors
+        params.append(to_pgvector(get_embedding_projection().project(embedding)))
+
+    option_filters, filter_params = build_option_filters(has_option, no_required_options, len(params) + 1)
+
+    async with get_connection() as conn, conn.transaction():
+        await set_candidate_search_breadth(conn, first_stage, candidates)
         # Use cosine similarity for vector search
         # 1 - (embedding <=> query_embedding) converts distance to similarity (0-1 range)
-        results = await conn.fetch("""
+        results = await conn.fetch(f"""
             SELECT
                 r.id,
                 r.recipe_name,
@@ -124,32 +306,109 @@ async def find_recipes_by_semantic_search(
                 m.recipe_count,
                 1 - (e.embedding <=> $1::vector) AS relevance_score
             FROM recipes r
-            INNER JOIN recipe_embeddings e ON r.id = e.recipe_id
+            INNER JOIN {embedding_source} ON r.id = e.recipe_id
             LEFT JOIN recipe_metadata m ON r.id = m.recipe_id
-            WHERE 1 - (e.embedding <=> $1::vector) >= $2
+            WHERE 1 - (e.embedding <=> $1::vector) >= $2{option_filters}
             ORDER BY relevance_score DESC
             LIMIT $3
-        """, embedding_str, min_score, limit)
+        """, *params, *filter_params)
 
-        return [
-            {
-                'recipe_id': r['recipe_name'],
-                'name': r['display_name'] or extract_title_from_markdown(r['markdown_doc']),
-                'description': r['description'] or extract_description_from_markdown(r['markdown_doc']),
-                'tags': r['tags'] or [],
-                'is_composite': r['is_composite'],
-                'recipe_count': r['recipe_count'],
-                'relevance_score': float(r['relevance_score'])
-            }
-            for r in results
-        ]
+        return [_row_to_recipe(r) for r in results]
+
+
+async def find_recipes_by_batch_semantic_search(
+    embeddings,
+    limit: int = 5,
+    min_score: float = 0.0,
+    first_stage: Optional[str] = None
+) -> List[List[Dict]]:
+    """
+    Run several semantic searches in a single database round trip.
+
+    Each query vector is searched independently (top-k per query) through a
+    LATERAL join, so the result is equivalent to calling
+    find_recipes_by_semantic_search once per embedding.
+
+    Args:
+        embeddings: Query embeddings, one per search
+        limit: Maximum number of results per search
+        min_score: Minimum similarity score (0.0-1.0) for results
+        first_stage: Candidate retrieval mode (see find_recipes_by_semantic_search)
+
+    Returns:
+        One list of recipe dictionaries per embedding, in input order
+    """
+    vectors = [to_pgvector(embedding) for embedding in embeddings]
+    if not vectors:
+        return []
+
+    first_stage = first_stage or default_first_stage()
+    candidates = max(config.RERANK_CANDIDATES, limit)
+    reduced_vector = 'q.reduced_vector' if first_stage == 'reduced' else None
+    embedding_source = embedding_rows(first_stage, 'q.query_vector::vector', candidates, reduced_vector)
+    params = [vectors, min_score, limit]
+    queries = "unnest($1::text[]) WITH ORDINALITY AS q(query_vector, query_idx)"
+    if reduced_vector:
+        projection = get_embedding_projection()
+        params.append([to_pgvector(projection.project(embedding)) for embedding in embeddings])
+        queries = "unnest($1::text[], $4::text[]) WITH ORDINALITY AS q(query_vector, reduced_vector, query_idx)"
+
+    async with get_connection() as conn, conn.transaction():
+        await set_candidate_search_breadth(conn, first_stage, candidates)
+        results = await conn.fetch(f"""
+            SELECT
+                q.query_idx,
+                c.*
+            FROM {queries}
+            CROSS JOIN LATERAL (
+                SELECT
+                    r.id,
+                    r.recipe_name,
+                    r.markdown_doc,
+                    m.display_name,
+                    m.description,
+                    m.tags,
+                    m.is_composite,
+                    m.recipe_count,
+                    1 - (e.embedding <=> q.query_vector::vector) AS relevance_score
+                FROM recipes r
+                INNER JOIN {embedding_source} ON r.id = e.recipe_id
+                LEFT JOIN recipe_metadata m ON r.id = m.recipe_id
+                WHERE 1 - (e.embedding <=> q.query_vector::vector) >= $2
+                ORDER BY relevance_score DESC
+                LIMIT $3
+            ) c
+            ORDER BY q.query_idx, c.relevance_score DESC
+        """, *params)
+
+    grouped: List[List[Dict]] = [[] for _ in vectors]
+    for r in results:
+        grouped[r['query_idx'] - 1].append(_row_to_recipe(r))
+    return grouped
+
+
+def _row_to_recipe(r) -> Dict:
+    """Convert a semantic search row into a recipe dictionary."""
+    return {
+        'recipe_id': r['recipe_name'],
+        'name': r['display_name'] or extract_title_from_markdown(r['markdown_doc']),
+        'description': r['description'] or extract_description_from_markdown(r['markdown_doc']),
+        'tags': r['tags'] or [],
+        'is_composite': r['is_composite'],
+        'recipe_count': r['recipe_count'],
+        'relevance_score': float(r['relevance_score'])
+    }
 
 
 async def find_recipes_by_multi_query_search(
     intents: List[str],
     limit: int = 5,
     min_score: float = 0.0,
-    k: int = 60
+    k: int = 60,
+    per_query_limit: Optional[int] = None,
+    embeddings=None,
+    has_option: Optional[str] = None,
+    no_required_options: bool = False
 ) -> List[Dict]:
     """
     Find recipes using multiple query variations with Reciprocal Rank Fusion.
@@ -162,6 +421,10 @@ async def find_recipes_by_multi_query_search(
         limit: Maximum number of results after fusion
         min_score: Minimum similarity score for individual queries
         k: RRF constant (default: 60, based on literature)
+        per_query_limit: Results fetched per query before fusion (default: limit * 2)
+        embeddings: Precomputed embeddings, one per intent (encoded per query if omitted)
+        has_option: Only return recipes that have an option with this name
+        no_required_options: Only return recipes without required options
 
     Returns:
         Fused and re-ranked list of recipes with fusion metadata
@@ -174,6 +437,9 @@ async def find_recipes_by_multi_query_search(
     """
     from collections import defaultdict
 
+    if per_query_limit is None:
+        per_query_limit = limit * 2  # Get more results per query for better fusion
+
     logger.info(f"Multi-query search with {len(intents)} queries (limit={limit}, min_score={min_score})")
 
     # Step 1: Execute search for each query
@@ -183,8 +449,11 @@ async def find_recipes_by_multi_query_search(
         try:
             results = await find_recipes_by_semantic_search(
                 intent=intent,
-                limit=limit * 2,  # Get more results per query for better fusion
-                min_score=min_score
+                limit=per_query_limit,
+                min_score=min_score,
+                embedding=embeddings[idx] if embeddings is not None else None,
+                has_option=has_option,
+                no_required_options=no_required_options
             )
             all_results.append(results)
             logger.debug(f"Query {idx+1} returned {len(results)} results")
@@ -264,6 +533,136 @@ async def get_recipe_details(recipe_name: str) -> Optional[Dict]:
         }
 
 
+async def get_recipe_option_schemas(recipe_name: str) -> Optional[Dict]:
+    """
+    Get the option schemas of a recipe from structured metadata.
+
+    Args:
+        recipe_name: Unique recipe name (fully qualified)
+
+    Returns:
+        Dictionary with recipe_id and options list, or None if not found
+    """
+    async with get_connection() as conn:
+        recipe = await conn.fetchrow("""
+            SELECT r.recipe_name, m.options
+            FROM recipes r
+            LEFT JOIN recipe_metadata m ON r.id = m.recipe_id
+            WHERE r.recipe_name = $1
+        """, recipe_name)
+
+        if not recipe:
+            return None
+
+        return {
+            'recipe_id': recipe['recipe_name'],
+            'options': json.loads(recipe['options']) if recipe['options'] else []
+        }
+
+
+async def get_similar_recipes(recipe_name: str, limit: int = 5) -> Optional[List[Dict]]:
+    """
+    Get precomputed related recipes of a recipe.
+
+    Served from the recipe_neighbors table filled at ingestion time, so no
+    embedding model inference or vector scan is needed.
+
+    Args:
+        recipe_name: Unique recipe name (fully qualified)
+        limit: Maximum number of related recipes to return
+
+    Returns:
+        List of related recipe dictionaries ordered by similarity,
+        or None if the recipe does not exist
+    """
+    async with get_connection() as conn:
+        recipe_id = await conn.fetchval(
+            "SELECT id FROM recipes WHERE recipe_name = $1", recipe_name
+        )
+        if recipe_id is None:
+            return None
+
+        results = await conn.fetch("""
+            SELECT
+                r.recipe_name,
+                m.display_name,
+                m.description,
+                m.tags,
+                n.similarity
+            FROM recipe_neighbors n
+            INNER JOIN recipes r ON r.id = n.neighbor_id
+            LEFT JOIN recipe_metadata m ON m.recipe_id = n.neighbor_id
+            WHERE n.recipe_id = $1
+            ORDER BY n.rank
+            LIMIT $2
+        """, recipe_id, limit)
+
+        return [
+            {
+                'recipe_id': r['recipe_name'],
+                'name': r['display_name'] or r['recipe_name'].rsplit('.', 1)[-1],
+                'description': r['description'] or "No description available",
+                'tags': r['tags'] or [],
+                'similarity': float(r['similarity'])
+            }
+            for r in results
+        ]
+
+
+async def get_index_fingerprint() -> str:
+    """
+    Compute a fingerprint of the ingested index and the search settings.
+
+    Every database image is produced by a fresh ingestion run, so row counts
+    combined with the latest write timestamps change whenever the image does.
+    Recipe metadata is covered separately because a re-ingest that only
+    changes recipe options rewrites recipe_metadata alone.
+    The stored projection is included because a re-ingest that only changes
+    REDUCED_DIMENSION rewrites embedding_reduced without touching those
+    timestamps, and the first search stage and its candidate count are
+    included because two-stage results differ from exact ones.
+
+    This must be called after the projection is loaded (REDUCED_SEARCH).
+
+    Returns:
+        Hex digest identifying the current recipe and embedding data
+    """
+    async with get_connection() as conn:
+        row = await conn.fetchrow("""
+            SELECT
+                (SELECT COUNT(*) FROM recipes) AS recipe_count,
+                (SELECT MAX(updated_at) FROM recipes) AS recipes_updated_at,
+                (SELECT COUNT(*) FROM recipe_metadata) AS metadata_count,
+                (SELECT MAX(updated_at) FROM recipe_metadata) AS metadata_updated_at,
+                (SELECT COUNT(*) FROM recipe_embeddings) AS embedding_count,
+                (SELECT MAX(created_at) FROM recipe_embeddings) AS embeddings_created_at
+        """)
+        try:
+            projection = await conn.fetchrow("""
+                SELECT method, dimension, created_at
+                FROM embedding_projections
+                WHERE embedding_model = $1
+            """, config.EMBEDDING_MODEL)
+        except asyncpg.UndefinedTableError:
+            # Database image built before reduced vectors existed
+            projection = None
+
+    first_stage = default_first_stage()
+    parts = [
+        str(row['recipe_count']),
+        str(row['recipes_updated_at']),
+        str(row['metadata_count']),
+        str(row['metadata_updated_at']),
+        str(row['embedding_count']),
+        str(row['embeddings_created_at']),
+        config.EMBEDDING_MODEL,
+        ','.join(str(value) for value in projection) if projection else '',
+        first_stage,
+        str(config.RERANK_CANDIDATES) if first_stage != 'none' else ''
+    ]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
 async def get_recipe_count() -> int:
     """Get total number of recipes in database."""
     async with get_connection() as conn:
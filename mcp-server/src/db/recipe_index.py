@@ -0,0 +1,160 @@
+"""In-memory index of recipe names and option schemas.
+
+Loaded once at startup so that bulk validation of recipe names and option keys
+is answered without a database round trip per name.
+"""
+import difflib
+import json
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import asyncpg
+
+from db.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Global index instance
+_index: Optional["RecipeIndex"] = None
+
+# "## Options" section of the generated markdown, up to the next heading
+_OPTIONS_SECTION = re.compile(r'^## Options[ \t]*\n(.*?)(?=^#{1,6} |\Z)', re.MULTILINE | re.DOTALL)
+
+# Table cell separator (pipes escaped as \| belong to the cell content)
+_CELL_SEPARATOR = re.compile(r'(?<!\\)\|')
+
+
+def parse_options_from_markdown(markdown: str) -> List[Dict]:
+    """
+    Parse the options table of a recipe's markdown documentation.
+
+    The generator emits rows like:
+        | `String` | newVersion | *Optional*. The version to upgrade to. | `3.2.x` |
+
+    Args:
+        markdown: Full recipe markdown documentation
+
+    Returns:
+        List of option dictionaries with name, type and required flag
+    """
+    match = _OPTIONS_SECTION.search(markdown)
+    if not match:
+        return []
+
+    options = []
+    for line in match.group(1).splitlines():
+        line = line.strip()
+        if not line.startswith('|'):
+            continue
+        cells = [c.strip() for c in _CELL_SEPARATOR.split(line.strip('|'))]
+        if len(cells) < 3 or cells[1] == 'Name' or set(cells[0]) <= set('- '):
+            continue
+        options.append({
+            'name': cells[1].replace('\\_', '_').strip('`'),
+            'type': cells[0].strip('`'),
+            'required': '*Optional*' not in cells[2]
+        })
+    return options
+
+
+class RecipeIndex:
+    """Recipe name set with per-recipe option schemas and name suggestions."""
+
+    def __init__(self, options_by_recipe: Dict[str, List[Dict]]):
+        self.names = set(options_by_recipe)
+        self.options = {
+            recipe_name: {option['name']: option for option in options}
+            for recipe_name, options in options_by_recipe.items()
+        }
+        self._sorted_names = sorted(self.names)
+
+        # Simple (unqualified) class name -> fully qualified names
+        self._by_simple_name = defaultdict(list)
+        for recipe_name in self._sorted_names:
+            self._by_simple_name[recipe_name.rsplit('.', 1)[-1].lower()].append(recipe_name)
+
+    def __contains__(self, recipe_name: str) -> bool:
+        return recipe_name in self.names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get_options(self, recipe_name: str) -> Dict[str, Dict]:
+        """Get the option schemas of a recipe keyed by option name."""
+        return self.options.get(recipe_name, {})
+
+    def suggest(self, recipe_name: str, limit: int = 3) -> List[str]:
+        """
+        Suggest existing recipe names close to an unknown one.
+
+        Recipes with the same simple class name in another package come first,
+        followed by the closest fully qualified names by edit similarity.
+        """
+        suggestions = list(self._by_simple_name.get(recipe_name.rsplit('.', 1)[-1].lower(), []))
+        for candidate in difflib.get_close_matches(recipe_name, self._sorted_names, n=limit, cutoff=0.75):
+            if candidate not in suggestions:
+                suggestions.append(candidate)
+        return suggestions[:limit]
+
+    @staticmethod
+    def suggest_option(option_name: str, known_options: List[str], limit: int = 3) -> List[str]:
+        """Suggest known option names close to an unknown one."""
+        lowered = {name.lower(): name for name in known_options}
+        if option_name.lower() in lowered:
+            return [lowered[option_name.lower()]]
+        return difflib.get_close_matches(option_name, known_options, n=limit, cutoff=0.5)
+
+
+async def load_recipe_index() -> RecipeIndex:
+    """
+    Load all recipe names and option schemas into memory.
+
+    This must be called after the database pool is initialized.
+    """
+    global _index
+
+    # Option schemas come from structured metadata; markdown is only read
+    # (and parsed) for recipes without stored options
+    async with get_connection() as conn:
+        try:
+            rows = await conn.fetch("""
+                SELECT
+                    r.recipe_name,
+                    m.options,
+                    CASE WHEN m.options IS NULL THEN r.markdown_doc END AS markdown_doc
+                FROM recipes r
+                LEFT JOIN recipe_metadata m ON r.id = m.recipe_id
+            """)
+        except (asyncpg.UndefinedColumnError, asyncpg.UndefinedTableError) as e:
+            # Database image built before option schemas were stored
+            logger.warning(
+                f"Stored option schemas unavailable ({e}); parsing options from markdown. "
+                f"Re-ingest the database to enable has_option/no_required_options filters"
+            )
+            rows = await conn.fetch("""
+                SELECT recipe_name, NULL AS options, markdown_doc
+                FROM recipes
+            """)
+
+    _index = RecipeIndex({
+        r['recipe_name']: (
+            json.loads(r['options']) if r['options'] is not None
+            else parse_options_from_markdown(r['markdown_doc'])
+        )
+        for r in rows
+    })
+    logger.info(f"Recipe index loaded ({len(_index)} recipes)")
+    return _index
+
+
+def get_recipe_index() -> RecipeIndex:
+    """
+    Get the in-memory recipe index.
+
+    Raises RuntimeError if the index has not been loaded.
+    """
+    if _index is None:
+        raise RuntimeError("Recipe index not loaded. Call load_recipe_index() first.")
+    return _index
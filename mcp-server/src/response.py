@@ -0,0 +1,237 @@
+"""Response shaping and compact serialization for tool outputs.
+
+Every tool response is serialized as compact JSON and reports its own size in
+'response_bytes'. Callers can restrict recipe entries to selected fields and
+set a byte budget: descriptions and documents are then truncated with a
+marker, and trailing recipe entries (or intent tree nodes) are dropped if
+still needed.
+"""
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import config
+from cache.session_tracker import SessionTracker
+
+# Response keys holding recipe entries (lists, or maps keyed by recipe id)
+RECIPE_COLLECTION_KEYS = ('recipes', 'similar_recipes')
+
+# Entry fields kept regardless of the 'fields' selection
+ALWAYS_KEPT_FIELDS = ('id', 'seen')
+
+# Appended to shortened text; get_recipe returns the full markdown documentation
+EXPAND_MARKER = " …[truncated; full documentation: get_recipe without max_bytes]"
+
+
+def to_json(response: Any) -> str:
+    """Serialize a response as compact JSON."""
+    return json.dumps(response, separators=(',', ':'), ensure_ascii=False)
+
+
+def byte_size(response: Any) -> int:
+    """Size of the serialized response in UTF-8 bytes."""
+    return len(to_json(response).encode('utf-8'))
+
+
+def _recipe_entries(response: Dict) -> Iterable[Tuple[Optional[str], Dict]]:
+    """Yield (recipe id, entry) for every recipe entry of the response."""
+    for key in RECIPE_COLLECTION_KEYS:
+        collection = response.get(key)
+        if isinstance(collection, list):
+            yield from ((entry.get('id'), entry) for entry in collection if isinstance(entry, dict))
+        elif isinstance(collection, dict):
+            yield from ((recipe_id, entry) for recipe_id, entry in collection.items() if isinstance(entry, dict))
+
+
+def _map_entries(response: Dict, transform: Callable[[str, Dict], Dict]):
+    """Replace every recipe entry by transform(recipe_id, entry)."""
+    for key in RECIPE_COLLECTION_KEYS:
+        collection = response.get(key)
+        if isinstance(collection, list):
+            response[key] = [
+                transform(entry.get('id'), entry) if isinstance(entry, dict) else entry
+                for entry in collection
+            ]
+        elif isinstance(collection, dict):
+            response[key] = {
+                recipe_id: transform(recipe_id, entry) if isinstance(entry, dict) else entry
+                for recipe_id, entry in collection.items()
+            }
+
+
+def _select_fields(response: Dict, fields: List[str]):
+    """Keep only the selected fields in every recipe entry."""
+    keep = set(fields) | set(ALWAYS_KEPT_FIELDS)
+    _map_entries(response, lambda recipe_id, entry: {k: v for k, v in entry.items() if k in keep})
+
+
+def _record_delivery(response: Dict, session: SessionTracker):
+    """Record the summaries and document the final response contains."""
+    for recipe_id, entry in _recipe_entries(response):
+        if recipe_id is not None:
+            session.record_summary(recipe_id, entry)
+    document = response.get('markdown_documentation')
+    if isinstance(document, str) and 'recipe_id' in response:
+        session.record('document', response['recipe_id'], {'markdown_documentation': document})
+
+
+def _truncate_descriptions(response: Dict, max_chars: int):
+    """Shorten long recipe descriptions and mark them as expandable."""
+    for _, entry in _recipe_entries(response):
+        description = entry.get('description')
+        if isinstance(description, str) and len(description) > max_chars:
+            entry['description'] = description[:max_chars].rstrip() + EXPAND_MARKER
+
+
+def _truncate_document(response: Dict, max_bytes: int):
+    """Cut markdown documentation so the response fits into max_bytes."""
+    document = response.get('markdown_documentation')
+    if not isinstance(document, str):
+        return
+
+    response['markdown_documentation'] = ''
+    available = max_bytes - byte_size(response) - len(EXPAND_MARKER.encode('utf-8'))
+    encoded = document.encode('utf-8')
+    if len(encoded) <= available:
+        response['markdown_documentation'] = document
+        return
+
+    cut = encoded[:max(available, 0)].decode('utf-8', errors='ignore')
+    response['markdown_documentation'] = cut + EXPAND_MARKER
+
+
+def _drop_trailing_nodes(response: Dict, max_bytes: int):
+    """
+    Drop intent tree nodes from the end until the response fits into max_bytes.
+
+    Recipe summaries in the shared 'recipes' map are removed only once no
+    remaining node refers to them, and their node match counts follow the
+    remaining nodes.
+    """
+    nodes = response.get('nodes')
+    recipes = response.get('recipes')
+    if not isinstance(nodes, list) or not isinstance(recipes, dict):
+        return
+
+    # Reserve room for the count reported below
+    response['omitted_node_count'] = 0
+    omitted = 0
+    while nodes and byte_size(response) > max_bytes:
+        nodes.pop()
+        omitted += 1
+        response['omitted_node_count'] = omitted
+
+        matches: Dict[str, int] = {}
+        for node in nodes:
+            for match in node.get('recipes', []):
+                matches[match['id']] = matches.get(match['id'], 0) + 1
+        for recipe_id in [r for r in recipes if r not in matches]:
+            del recipes[recipe_id]
+        for recipe_id, entry in recipes.items():
+            if isinstance(entry, dict) and 'node_matches' in entry:
+                entry['node_matches'] = matches[recipe_id]
+        response['node_count'] = len(nodes)
+        response['unique_recipe_count'] = len(recipes)
+
+    if not omitted:
+        del response['omitted_node_count']
+
+
+def _drop_trailing_entries(
+    response: Dict,
+    max_bytes: int,
+    next_cursor_at: Optional[Callable[[int], Optional[str]]] = None
+):
+    """
+    Drop recipe entries from the end until the response fits into max_bytes.
+
+    Counts follow the remaining entries, and a paginated response gets a
+    'next_cursor' pointing at the first dropped entry, so no result becomes
+    unreachable.
+
+    Args:
+        response: Tool response dictionary
+        max_bytes: Byte budget for the serialized response
+        next_cursor_at: Builds the cursor of the page continuing after the
+            given number of entries of this page
+    """
+    # Reserve room for the count reported below
+    response['omitted_count'] = 0
+    omitted = 0
+    for key in RECIPE_COLLECTION_KEYS:
+        collection = response.get(key)
+        # Map entries of an intent tree are only dropped with their nodes
+        if not isinstance(collection, (list, dict)) or 'nodes' in response:
+            continue
+        while collection and byte_size(response) > max_bytes:
+            if isinstance(collection, list):
+                collection.pop()
+                if 'total_count' in response:
+                    response['total_count'] = len(collection)
+                if next_cursor_at is not None and 'next_cursor' in response:
+                    response['next_cursor'] = next_cursor_at(len(collection))
+            else:
+                collection.popitem()
+            omitted += 1
+            response['omitted_count'] = omitted
+
+    if not omitted:
+        del response['omitted_count']
+
+
+def shape_response(
+    response: Dict,
+    max_bytes: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    next_cursor_at: Optional[Callable[[int], Optional[str]]] = None,
+    session: Optional[SessionTracker] = None,
+    force_full: bool = False
+) -> str:
+    """
+    Shape a tool response to the caller's budget and serialize it.
+
+    With session deduplication, summaries delivered earlier are shortened
+    after the field selection, and deliveries are recorded only once the
+    response has its final shape.
+
+    Args:
+        response: Tool response dictionary
+        max_bytes: Byte budget for the serialized response (None or 0 = unlimited)
+        fields: Recipe entry fields to keep ('id' is always kept)
+        next_cursor_at: For paginated responses, builds 'next_cursor' after
+            the given number of entries (see _drop_trailing_entries)
+        session: Session tracker (None when deduplication is disabled)
+        force_full: Never shorten delivered summaries (delivery is still recorded)
+
+    Returns:
+        Compact JSON text including 'response_bytes'
+    """
+    # Work on a copy so cached or stored result objects are never modified
+    response = json.loads(to_json(response))
+
+    if fields:
+        _select_fields(response, fields)
+
+    if session is not None:
+        _map_entries(response, lambda recipe_id, entry: session.shorten_summary(recipe_id, entry, force_full))
+
+    if max_bytes and byte_size(response) > max_bytes:
+        # Reserve room for the markers reported with a truncated response
+        response['truncated'] = True
+        response['response_bytes'] = max_bytes
+        _truncate_descriptions(response, config.DESCRIPTION_TRUNCATE_CHARS)
+        _truncate_document(response, max_bytes)
+        _drop_trailing_nodes(response, max_bytes)
+        _drop_trailing_entries(response, max_bytes, next_cursor_at)
+
+    if session is not None:
+        _record_delivery(response, session)
+
+    # Report the final size; repeat until the size field itself is accounted for
+    response['response_bytes'] = 0
+    while True:
+        size = byte_size(response)
+        if response['response_bytes'] == size:
+            break
+        response['response_bytes'] = size
+
+    return to_json(response)
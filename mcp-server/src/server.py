@@ -2,17 +2,26 @@
 """OpenRewrite MCP Server - Main server implementation."""
 import sys
 import logging
-import json
 from typing import Optional
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 import mcp.server.stdio
 
 from config import config
+from response import shape_response
 from db.connection import init_pool, close_pool
+from db.queries import get_index_fingerprint
+from db.projection import load_embedding_projection
+from db.recipe_index import load_recipe_index
+from cache.result_cache import init_result_cache, close_result_cache
+from cache.session_tracker import init_session_tracker, get_session_tracker
 from tools.test_connection import test_connection
 from tools.find_recipes import find_recipes
+from tools.find_recipes_for_tree import find_recipes_for_tree
 from tools.get_recipe import get_recipe
+from tools.get_recipe_options import get_recipe_options
+from tools.similar_recipes import similar_recipes
+from tools.validate_recipe_list import validate_recipe_list
 
 
 # Configure logging to stderr only (CRITICAL: never stdout, corrupts JSON-RPC)
@@ -27,6 +36,34 @@ logger = logging.getLogger(__name__)
 # Initialize MCP server
 app = Server(config.SERVER_NAME)
 
+# Response shaping parameters shared by tools returning recipes or documents
+MAX_BYTES_PROPERTY = {
+    "type": "integer",
+    "description": "Byte budget for the response. When exceeded, descriptions/documentation are truncated (marked with '[truncated; ...]', get_recipe without max_bytes returns the full documentation) and trailing recipes or tree nodes are dropped ('truncated': true; find_recipes' next_cursor then starts at the first dropped recipe). Every response reports its size in 'response_bytes'.",
+    "minimum": 256
+}
+FIELDS_PROPERTY = {
+    "type": "array",
+    "items": {
+        "type": "string",
+        "enum": ["name", "description", "tags", "score", "fusion_score", "query_matches", "node_matches"]
+    },
+    "description": "Recipe fields to include in each result ('id' is always included). Omit for all fields."
+}
+
+
+def reply(response: dict, arguments: dict, next_cursor_at=None) -> list[TextContent]:
+    """Shape a tool response to the requested budget, deduplicate it within the session and serialize it."""
+    text = shape_response(
+        response,
+        arguments.get("max_bytes"),
+        arguments.get("fields"),
+        next_cursor_at,
+        get_session_tracker(),
+        arguments.get("full", False)
+    )
+    return [TextContent(type="text", text=text)]
+
 
 @app.list_tools()
 async def list_tools() -> list[Tool]:
@@ -47,7 +84,7 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="find_recipes",
-            description="Find OpenRewrite recipes based on user intent. Uses semantic search to discover relevant recipes. SUPPORTS MULTI-QUERY: Pass 'intent' as a STRING for single query OR as an ARRAY of 2-5 query variations for batched search with improved recall.",
+            description="Find OpenRewrite recipes based on user intent. Uses semantic search to discover relevant recipes. SUPPORTS MULTI-QUERY: Pass 'intent' as a STRING for single query OR as an ARRAY of 2-5 query variations for batched search with improved recall. SUPPORTS PAGINATION: pass the returned 'next_cursor' as 'cursor' to get more results instead of repeating the search with a larger limit. 'intent' is required unless 'cursor' is given.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -65,7 +102,7 @@ async def list_tools() -> list[Tool]:
                                 "description": "Multiple query variations for improved recall"
                             }
                         ],
-                        "description": "Description of what you want to accomplish. Provide a SINGLE STRING for simple searches, or an ARRAY OF 2-5 QUERY VARIATIONS for improved recall. When using multiple queries, provide different phrasings of the same intent (e.g., ['migrate to Spring Boot 3', 'upgrade Spring Boot version', 'Spring Boot 3.x migration']). Multiple queries use Reciprocal Rank Fusion to find recipes that match any variation."
+                        "description": "Description of what you want to accomplish. Provide a SINGLE STRING for simple searches, or an ARRAY OF 2-5 QUERY VARIATIONS for improved recall. When using multiple queries, provide different phrasings of the same intent (e.g., ['migrate to Spring Boot 3', 'upgrade Spring Boot version', 'Spring Boot 3.x migration']). Multiple queries use Reciprocal Rank Fusion to find recipes that match any variation. Near-identical variations are collapsed before searching and reported in 'collapsed_queries'."
                     },
                     "limit": {
                         "type": "integer",
@@ -80,9 +117,66 @@ async def list_tools() -> list[Tool]:
                         "default": 0.5,
                         "minimum": 0.0,
                         "maximum": 1.0
-                    }
+                    },
+                    "has_option": {
+                        "type": "string",
+                        "description": "Only return recipes that have an option with this name (e.g. 'newVersion')"
+                    },
+                    "no_required_options": {
+                        "type": "boolean",
+                        "description": "Only return recipes that can run without configuring any options",
+                        "default": False
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "'next_cursor' from a previous find_recipes response. Returns the next page of that search without re-running it; 'intent' and filters are ignored."
+                    },
+                    "full": {
+                        "type": "boolean",
+                        "description": "Return full recipe descriptions even if already delivered in this session (only relevant when session deduplication is enabled)",
+                        "default": False
+                    },
+                    "max_bytes": MAX_BYTES_PROPERTY,
+                    "fields": FIELDS_PROPERTY
+                }
+            }
+        ),
+        Tool(
+            name="find_recipes_for_tree",
+            description="Find OpenRewrite recipes for every node of an intent tree in a single call. Use this instead of calling find_recipes once per intent. Accepts nested nodes with an 'intent' (or 'description'/'name') field and 'children' (or 'sub_intents'/'atomic_changes'). An intent-tree.json document can be passed as-is: its level sections (strategic_intent down to atomic_changes) are searched below the strategic intent, analysis sections are ignored. Returns per-node recipe ids and scores, with each matched recipe summarized once in a shared 'recipes' map.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "tree": {
+                        "oneOf": [
+                            {"type": "object"},
+                            {"type": "array"}
+                        ],
+                        "description": "Intent tree: a node object, or an array of nodes/strings. Node: {'id': optional, 'intent': text, 'children': [nodes or strings]}"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of results per node",
+                        "default": 5,
+                        "minimum": 1,
+                        "maximum": 20
+                    },
+                    "min_score": {
+                        "type": "number",
+                        "description": "Minimum relevance score threshold (0.0 to 1.0)",
+                        "default": 0.5,
+                        "minimum": 0.0,
+                        "maximum": 1.0
+                    },
+                    "full": {
+                        "type": "boolean",
+                        "description": "Return full recipe descriptions even if already delivered in this session (only relevant when session deduplication is enabled)",
+                        "default": False
+                    },
+                    "max_bytes": MAX_BYTES_PROPERTY,
+                    "fields": FIELDS_PROPERTY
                 },
-                "required": ["intent"]
+                "required": ["tree"]
             }
         ),
         Tool(
@@ -94,10 +188,72 @@ async def list_tools() -> list[Tool]:
                     "recipe_id": {
                         "type": "string",
                         "description": "Unique identifier for the recipe (e.g., 'org.openrewrite.java.spring.boot3.UpgradeSpringBoot_3_0')"
+                    },
+                    "full": {
+                        "type": "boolean",
+                        "description": "Return the full documentation even if it was already delivered in this session (only relevant when session deduplication is enabled)",
+                        "default": False
+                    },
+                    "max_bytes": MAX_BYTES_PROPERTY
+                },
+                "required": ["recipe_id"]
+            }
+        ),
+        Tool(
+            name="get_recipe_options",
+            description="Get the configuration options of a specific OpenRewrite recipe (name, type, required, example, description) without fetching its full documentation.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "recipe_id": {
+                        "type": "string",
+                        "description": "Unique identifier for the recipe (e.g., 'org.openrewrite.gradle.plugins.UpgradePluginVersion')"
                     }
                 },
                 "required": ["recipe_id"]
             }
+        ),
+        Tool(
+            name="similar_recipes",
+            description="Find recipes related to a known OpenRewrite recipe (alternatives, variants for other build tools or versions). Uses precomputed nearest neighbors, so it is much cheaper than a new find_recipes search.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "recipe_id": {
+                        "type": "string",
+                        "description": "Unique identifier of the reference recipe (e.g., 'org.openrewrite.gradle.UpdateGradleWrapper')"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": f"Maximum number of related recipes to return (at most {config.NEIGHBORS_TOP_N} neighbors are stored per recipe)",
+                        "default": 5,
+                        "minimum": 1,
+                        "maximum": config.NEIGHBORS_TOP_N
+                    },
+                    "full": {
+                        "type": "boolean",
+                        "description": "Return full recipe descriptions even if already delivered in this session (only relevant when session deduplication is enabled)",
+                        "default": False
+                    },
+                    "max_bytes": MAX_BYTES_PROPERTY,
+                    "fields": FIELDS_PROPERTY
+                },
+                "required": ["recipe_id"]
+            }
+        ),
+        Tool(
+            name="validate_recipe_list",
+            description="Validate every recipe name and option key referenced in a declarative recipe YAML (e.g. recommended-recipe.yaml) in one call. Returns all unknown recipes and options with nearest-name suggestions, plus missing required options. Use before running a recipe instead of checking names one by one with get_recipe.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "yaml": {
+                        "type": "string",
+                        "description": "Recipe YAML text; may contain several '---' separated documents"
+                    }
+                },
+                "required": ["yaml"]
+            }
         )
     ]
 
@@ -108,25 +264,36 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     try:
         logger.info(f"Tool called: {name} with arguments: {arguments}")
 
+        # Session deduplication: already delivered documents become references
+        # (recipe summaries are shortened by reply())
+        session = get_session_tracker()
+        force_full = arguments.get("full", False)
+
         if name == "test_connection":
             result = await test_connection(arguments.get("message"))
-            return [TextContent(type="text", text=json.dumps(result, indent=2))]
+            return reply(result, arguments)
 
         elif name == "find_recipes":
-            intent = arguments["intent"]
+            intent = arguments.get("intent")
             limit = arguments.get("limit")
             min_score = arguments.get("min_score")
+            has_option = arguments.get("has_option")
+            no_required_options = arguments.get("no_required_options", False)
+            cursor = arguments.get("cursor")
 
-            results = await find_recipes(intent, limit, min_score)
+            results, search_info = await find_recipes(
+                intent, limit, min_score, has_option, no_required_options, cursor
+            )
 
             if not results:
                 response = {
                     "recipes": [],
                     "total_count": 0,
                     "query": intent,
+                    "collapsed_queries": search_info["collapsed_queries"],
                     "message": "No recipes found matching the given criteria. Try lowering min_score or using different keywords."
                 }
-                return [TextContent(type="text", text=json.dumps(response, indent=2))]
+                return reply(response, arguments)
 
             # Return structured JSON response
             response = {
@@ -146,10 +313,28 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                     for recipe in results
                 ],
                 "total_count": len(results),
-                "query": intent if isinstance(intent, str) else f"{len(intent)} query variations",
-                "is_multi_query": isinstance(intent, list) and len(intent) > 1
+                "query": intent if isinstance(intent, str) else (f"{len(intent)} query variations" if intent else None),
+                "is_multi_query": isinstance(intent, list) and len(intent) > 1,
+                # Variations dropped as near-duplicates of another variation
+                "collapsed_queries": search_info["collapsed_queries"],
+                # Pass back as 'cursor' to get the next page (None on the last page)
+                "next_cursor": search_info["next_cursor"]
             }
-            return [TextContent(type="text", text=json.dumps(response, indent=2))]
+            # Recipes dropped for max_bytes stay reachable through next_cursor
+            return reply(response, arguments, search_info["cursor_at"])
+
+        elif name == "find_recipes_for_tree":
+            try:
+                response = await find_recipes_for_tree(
+                    arguments["tree"],
+                    arguments.get("limit"),
+                    arguments.get("min_score")
+                )
+            except ValueError as e:
+                error_response = {"error": str(e)}
+                return reply(error_response, arguments)
+
+            return reply(response, arguments)
 
         elif name == "get_recipe":
             recipe_id = arguments["recipe_id"]
@@ -161,23 +346,69 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                     "error": str(e),
                     "recipe_id": recipe_id
                 }
-                return [TextContent(type="text", text=json.dumps(error_response, indent=2))]
+                return reply(error_response, arguments)
 
             # Return structured JSON with recipe details
             response = {
                 "recipe_id": recipe["recipe_id"],
                 "markdown_documentation": recipe["markdown_documentation"]
             }
-            return [TextContent(type="text", text=json.dumps(response, indent=2))]
+            # Delivery is recorded by reply() with the document as actually sent
+            if session is not None and not force_full and session.was_delivered(
+                'document', recipe["recipe_id"], {"markdown_documentation": recipe["markdown_documentation"]}
+            ):
+                response = {
+                    "recipe_id": recipe["recipe_id"],
+                    "already_delivered": True,
+                    "message": "Documentation was already returned earlier in this session. Call again with full=true to resend it."
+                }
+            return reply(response, arguments)
+
+        elif name == "get_recipe_options":
+            recipe_id = arguments["recipe_id"]
+
+            try:
+                response = await get_recipe_options(recipe_id)
+            except ValueError as e:
+                error_response = {
+                    "error": str(e),
+                    "recipe_id": recipe_id
+                }
+                return reply(error_response, arguments)
+
+            return reply(response, arguments)
+
+        elif name == "similar_recipes":
+            recipe_id = arguments["recipe_id"]
+
+            try:
+                response = await similar_recipes(recipe_id, arguments.get("limit"))
+            except ValueError as e:
+                error_response = {
+                    "error": str(e),
+                    "recipe_id": recipe_id
+                }
+                return reply(error_response, arguments)
+
+            return reply(response, arguments)
+
+        elif name == "validate_recipe_list":
+            try:
+                response = await validate_recipe_list(arguments["yaml"])
+            except ValueError as e:
+                error_response = {"error": str(e)}
+                return reply(error_response, arguments)
+
+            return reply(response, arguments)
 
         else:
             error_response = {"error": f"Unknown tool: {name}"}
-            return [TextContent(type="text", text=json.dumps(error_response, indent=2))]
+            return reply(error_response, arguments)
 
     except Exception as e:
         logger.error(f"Error executing tool {name}: {e}", exc_info=True)
         error_response = {"error": str(e), "tool": name}
-        return [TextContent(type="text", text=json.dumps(error_response, indent=2))]
+        return reply(error_response, {})
 
 
 async def main():
@@ -199,6 +430,29 @@ async def main():
         logger.error("Server cannot start without database connection")
         sys.exit(1)
 
+    # Optional session mode: later responses reference already delivered payloads
+    if config.SESSION_DEDUP:
+        init_session_tracker()
+
+    # Load recipe names and option schemas for bulk validation
+    await load_recipe_index()
+
+    # Optional reduced-dimension first search stage
+    if config.REDUCED_SEARCH and await load_embedding_projection() is None:
+        logger.error(f"REDUCED_SEARCH is enabled but no embedding projection is stored for '{config.EMBEDDING_MODEL}'")
+        logger.error("Re-ingest with REDUCED_DIMENSION set and the same EMBEDDING_MODEL, or disable REDUCED_SEARCH")
+        await close_pool()
+        sys.exit(1)
+
+    # Optional persistent result cache, invalidated when the index or search mode changes
+    if config.RESULT_CACHE_PATH:
+        fingerprint = await get_index_fingerprint()
+        init_result_cache(
+            path=config.RESULT_CACHE_PATH,
+            max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+            fingerprint=fingerprint
+        )
+
     logger.info("Server ready to accept connections via stdio")
 
     try:
@@ -210,6 +464,7 @@ async def main():
             )
     finally:
         # Cleanup on shutdown
+        close_result_cache()
         await close_pool()
         logger.info("Server shutdown complete")
 
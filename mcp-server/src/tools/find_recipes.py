@@ -2,21 +2,112 @@
 import sys
 import logging
 from pathlib import Path
-from typing import List, Dict, Union
+from typing import List, Dict, Optional, Tuple, Union
+
+import numpy as np
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from config import config
-from db.queries import find_recipes_by_semantic_search, find_recipes_by_multi_query_search
+from db.queries import (
+    encode_intents,
+    find_recipes_by_semantic_search,
+    find_recipes_by_multi_query_search
+)
+from cache.result_cache import get_result_cache
+from cache.cursor_store import get_cursor_store, encode_cursor, decode_cursor
 
 logger = logging.getLogger(__name__)
 
 
+def collapse_near_duplicates(
+    intents: List[str],
+    embeddings: np.ndarray,
+    threshold: float
+) -> Tuple[List[int], List[Dict]]:
+    """
+    Collapse query variations whose embeddings are near-duplicates.
+
+    Each query is compared against the queries kept so far (in request order);
+    if its cosine similarity to any of them reaches the threshold, it is
+    dropped in favour of the most similar kept query.
+
+    Args:
+        intents: Query variations in request order
+        embeddings: One embedding per intent
+        threshold: Cosine similarity at or above which queries are collapsed
+
+    Returns:
+        Tuple of (indices of kept intents, list of collapse records)
+    """
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    normalized = embeddings / np.clip(norms, 1e-12, None)
+
+    kept: List[int] = []
+    collapsed: List[Dict] = []
+    for idx in range(len(intents)):
+        if kept:
+            similarities = normalized[kept] @ normalized[idx]
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                collapsed.append({
+                    "query": intents[idx],
+                    "collapsed_into": intents[kept[best]],
+                    "similarity": round(float(similarities[best]), 4)
+                })
+                continue
+        kept.append(idx)
+
+    return kept, collapsed
+
+
+def paginate(
+    candidates: List[Dict],
+    search_info: Dict,
+    limit: int,
+    offset: int = 0,
+    token: str = None
+) -> Tuple[List[Dict], Dict]:
+    """
+    Cut one page out of a ranked candidate list.
+
+    When candidates remain after the page, the list is kept in the cursor
+    store (once per search) and a cursor for the next page is returned.
+    search_info also gets 'cursor_at', which builds the cursor continuing
+    after the first n entries of the page (used when a response budget
+    drops trailing entries).
+
+    Args:
+        candidates: Full ranked candidate list
+        search_info: Search metadata returned with every page
+        limit: Page size
+        offset: Index of the first candidate on this page
+        token: Cursor store token if the list is already stored
+
+    Returns:
+        Tuple of (page of recipes, search_info with 'next_cursor')
+    """
+    page = candidates[offset:offset + limit]
+
+    def cursor_at(kept: int) -> Optional[str]:
+        nonlocal token
+        if offset + kept >= len(candidates):
+            return None
+        if token is None:
+            token = get_cursor_store().put(candidates, search_info)
+        return encode_cursor(token, offset + kept)
+
+    return page, {**search_info, "next_cursor": cursor_at(len(page)), "cursor_at": cursor_at}
+
+
 async def find_recipes(
-    intent: Union[str, List[str]],
+    intent: Union[str, List[str]] = None,
     limit: int = None,
-    min_score: float = None
-) -> List[Dict]:
+    min_score: float = None,
+    has_option: str = None,
+    no_required_options: bool = False,
+    cursor: str = None
+) -> Tuple[List[Dict], Dict]:
     """
     Find OpenRewrite recipes based on user intent using semantic search.
 
@@ -30,15 +121,21 @@ async def find_recipes(
         intent: Single query string OR list of query variations
         limit: Maximum number of results to return (default: 5)
         min_score: Minimum similarity score threshold (default: from config)
+        has_option: Only return recipes that have an option with this name
+        no_required_options: Only return recipes that can run without options
+        cursor: Cursor from a previous call; returns the next page of that
+            search (all other arguments except limit are ignored)
 
     Returns:
-        List of recipe objects ordered by relevance score (single query)
-        or fusion score (multi-query)
+        Tuple of (recipes, search_info). Recipes are ordered by relevance
+        score (single query) or fusion score (multi-query). search_info
+        lists query variations collapsed as near-duplicates and the cursor
+        of the next page ('next_cursor', None on the last page).
 
     Examples:
         >>> # Single query
         >>> await find_recipes("upgrade Spring Boot to latest version")
-        [{'recipe_id': 'org.openrewrite.java.spring.boot3.UpgradeSpringBoot_3_0', ...}]
+        ([{'recipe_id': 'org.openrewrite.java.spring.boot3.UpgradeSpringBoot_3_0', ...}], {...})
 
         >>> # Multi-query for better recall
         >>> await find_recipes([
@@ -46,7 +143,7 @@ async def find_recipes(
         ...     "upgrade Spring Boot version",
         ...     "Spring Boot 3.x migration"
         ... ], limit=5)
-        [{'recipe_id': '...', 'fusion_score': 0.032, 'query_matches': 3, ...}]
+        ([{'recipe_id': '...', 'fusion_score': 0.032, 'query_matches': 3, ...}], {...})
     """
     # Apply defaults
     if limit is None:
@@ -54,7 +151,19 @@ async def find_recipes(
     if min_score is None:
         min_score = config.MIN_SIMILARITY_SCORE
 
+    # Follow-up pages are served from the stored candidate list
+    if cursor is not None:
+        token, offset = decode_cursor(cursor)
+        stored = get_cursor_store().get(token)
+        if stored is None:
+            raise ValueError("Cursor expired or unknown. Re-run find_recipes without a cursor.")
+        candidates, search_info = stored
+        logger.info(f"Serving page at offset {offset} from cursor ({len(candidates)} candidates)")
+        return paginate(candidates, search_info, limit, offset, token)
+
     # Normalize intent to list and validate
+    if intent is None:
+        raise ValueError("intent is required unless a cursor is given")
     if isinstance(intent, str):
         intents = [intent]
         is_multi_query = False
@@ -68,8 +177,8 @@ async def find_recipes(
     if not intents:
         raise ValueError("intent cannot be empty")
 
-    # Filter out empty strings
-    intents = [q.strip() for q in intents if q and q.strip()]
+    # Filter out empty strings and collapse whitespace
+    intents = [' '.join(q.split()) for q in intents if q and q.strip()]
     if not intents:
         raise ValueError("intent contains no valid queries")
 
@@ -91,6 +200,40 @@ async def find_recipes(
         logger.warning(f"Limiting queries from {len(intents)} to {max_queries}")
         intents = intents[:max_queries]
 
+    # Serve repeated queries from the persistent result cache
+    cache = get_result_cache()
+    cache_params = {
+        "intents": intents,
+        "limit": limit,
+        "min_score": min_score,
+        "has_option": has_option,
+        "no_required_options": no_required_options,
+        "intent_collapse_threshold": config.INTENT_COLLAPSE_THRESHOLD
+    }
+    if cache is not None:
+        cached = cache.get(cache_params)
+        if cached is not None:
+            logger.info(f"Result cache hit ({len(cached['recipes'])} recipes)")
+            return paginate(cached['recipes'], cached['search_info'], limit)
+
+    # Collapse semantically near-duplicate variations before searching
+    embeddings = None
+    collapsed = []
+    if len(intents) > 1:
+        embeddings = encode_intents(intents)
+        kept, collapsed = collapse_near_duplicates(
+            intents, embeddings, config.INTENT_COLLAPSE_THRESHOLD
+        )
+        if collapsed:
+            logger.info(f"Collapsed {len(collapsed)} near-duplicate queries")
+            intents = [intents[i] for i in kept]
+            embeddings = embeddings[kept]
+
+    search_info = {"collapsed_queries": collapsed}
+
+    # Rank a window of candidates so that later pages need no new search
+    window = max(limit, config.CURSOR_CANDIDATE_WINDOW)
+
     # Route to appropriate search function
     if len(intents) == 1:
         # Single query path (backward compatible)
@@ -100,8 +243,11 @@ async def find_recipes(
         try:
             results = await find_recipes_by_semantic_search(
                 intent=intents[0],
-                limit=limit,
-                min_score=min_score
+                limit=window,
+                min_score=min_score,
+                embedding=embeddings[0] if embeddings is not None else None,
+                has_option=has_option,
+                no_required_options=no_required_options
             )
         except Exception as e:
             logger.error(f"Semantic search failed: {e}", exc_info=True)
@@ -115,14 +261,21 @@ async def find_recipes(
         try:
             results = await find_recipes_by_multi_query_search(
                 intents=intents,
-                limit=limit,
-                min_score=min_score
+                limit=window,
+                per_query_limit=limit * 2,
+                min_score=min_score,
+                embeddings=embeddings,
+                has_option=has_option,
+                no_required_options=no_required_options
             )
         except Exception as e:
             logger.error(f"Multi-query search failed: {e}", exc_info=True)
             raise
 
-    logger.info(f"{query_type.capitalize()} search found {len(results)} recipes")
+    logger.info(f"{query_type.capitalize()} search found {len(results)} candidate recipes")
+
+    if cache is not None:
+        cache.put(cache_params, {"recipes": results, "search_info": search_info})
 
     # Log top result for debugging
     if results:
@@ -132,4 +285,4 @@ async def find_recipes(
         else:
             logger.debug(f"Top result: {top['recipe_id']} (score: {top['relevance_score']:.3f})")
 
-    return results
+    return paginate(results, search_info, limit)
@@ -0,0 +1,186 @@
+"""Find recipes for every node of an intent tree in one batch."""
+import re
+import sys
+import logging
+from pathlib import Path
+from typing import Any, List, Dict, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import config
+from db.queries import encode_intents, find_recipes_by_batch_semantic_search
+
+logger = logging.getLogger(__name__)
+
+# Node fields holding the intent text, in order of preference
+TEXT_FIELDS = ('intent', 'description', 'name')
+
+# Node fields whose list items are child intents (plain strings allowed)
+CHILD_FIELDS = ('children', 'sub_intents', 'atomic_changes')
+
+# Sections of an intent-tree.json document from the strategic intent (level 1)
+# down to atomic changes (level 5); analysis sections are not searched
+LEVEL_FIELDS = (
+    'strategic_intent',
+    'cross_cutting_concerns',
+    'technology_specific_goals',
+    'detailed_transformation_goals',
+    'atomic_changes'
+)
+
+# Child intent strings numbered like "3.1.1: Update builder stage JDK"
+_NUMBERED_INTENT = re.compile(r'^(\d+(?:\.\d+)*):\s*(\S.*)$', re.DOTALL)
+
+
+def flatten_intent_tree(tree: Any) -> List[Dict]:
+    """
+    Flatten a nested intent tree into a list of searchable nodes.
+
+    A node is either a string or an object with an 'intent' (or 'description'
+    or 'name') text field. Children are nested under 'children', 'sub_intents'
+    or 'atomic_changes'; no other fields are walked. For an intent-tree.json
+    document only the level sections (LEVEL_FIELDS) are searched, and nodes of
+    levels 2-5 become children of the strategic intent. Nodes without an 'id'
+    take it from a "1.2: ..." prefix, or get a positional one ("1", "1.2", ...).
+
+    Args:
+        tree: Intent tree as an object, an array of nodes, or a single string
+
+    Returns:
+        List of {'id', 'parent_id', 'intent'} dictionaries in depth-first order
+    """
+    nodes: List[Dict] = []
+
+    def add_node(text: str, node_id: Optional[str], parent_id: Optional[str], position: int) -> str:
+        numbered = _NUMBERED_INTENT.match(text.strip())
+        if node_id is None and numbered:
+            node_id, text = numbered.groups()
+        if node_id is None:
+            node_id = f"{parent_id}.{position}" if parent_id else str(position)
+        nodes.append({'id': node_id, 'parent_id': parent_id, 'intent': ' '.join(text.split())})
+        return node_id
+
+    def walk(value: Any, parent_id: Optional[str], counter: List[int]) -> Optional[str]:
+        """Add the node(s) in value; returns the id of an object node."""
+        if isinstance(value, str):
+            if value.strip():
+                counter[0] += 1
+                add_node(value, None, parent_id, counter[0])
+        elif isinstance(value, list):
+            for item in value:
+                walk(item, parent_id, counter)
+        elif isinstance(value, dict):
+            text = next(
+                (value[f] for f in TEXT_FIELDS if isinstance(value.get(f), str) and value[f].strip()),
+                None
+            )
+            node_id = None
+            if text is not None:
+                counter[0] += 1
+                explicit_id = str(value['id']) if value.get('id') is not None else None
+                node_id = add_node(text, explicit_id, parent_id, counter[0])
+
+            child_counter = [0] if node_id is not None else counter
+            for key in CHILD_FIELDS:
+                if isinstance(value.get(key), (str, list, dict)):
+                    walk(value[key], node_id or parent_id, child_counter)
+            return node_id
+        return None
+
+    if isinstance(tree, dict) and any(key in tree for key in LEVEL_FIELDS):
+        counter = [0]
+        root_id = walk(tree.get('strategic_intent'), None, counter)
+        level_counter = [0] if root_id is not None else counter
+        for key in LEVEL_FIELDS[1:]:
+            walk(tree.get(key), root_id, level_counter)
+    else:
+        walk(tree, None, [0])
+    return nodes
+
+
+async def find_recipes_for_tree(
+    tree: Any,
+    limit: int = None,
+    min_score: float = None
+) -> Dict:
+    """
+    Find OpenRewrite recipes for every node of an intent tree.
+
+    All node texts are encoded in one model batch and searched in one
+    database round trip. Recipes matched by several nodes are returned once
+    in a shared 'recipes' map; per-node results only carry ids and scores.
+
+    Args:
+        tree: Nested intent tree (see flatten_intent_tree for accepted shapes)
+        limit: Maximum number of results per node (default: 5)
+        min_score: Minimum similarity score threshold (default: from config)
+
+    Returns:
+        Dictionary with per-node results and deduplicated recipe summaries
+
+    Raises:
+        ValueError: If the tree contains no intents
+    """
+    # Apply defaults
+    if limit is None:
+        limit = config.DEFAULT_RECIPE_LIMIT
+    if min_score is None:
+        min_score = config.MIN_SIMILARITY_SCORE
+
+    nodes = flatten_intent_tree(tree)
+    if not nodes:
+        raise ValueError("tree contains no intents")
+
+    if len(nodes) > config.MAX_TREE_NODES:
+        logger.warning(f"Limiting tree nodes from {len(nodes)} to {config.MAX_TREE_NODES}")
+        nodes = nodes[:config.MAX_TREE_NODES]
+
+    # Identical node texts are encoded and searched once
+    unique_intents = list(dict.fromkeys(node['intent'] for node in nodes))
+    logger.info(f"Tree search (nodes={len(nodes)}, unique_intents={len(unique_intents)}, limit={limit}, min_score={min_score})")
+
+    embeddings = encode_intents(unique_intents)
+    try:
+        grouped = await find_recipes_by_batch_semantic_search(
+            embeddings=embeddings,
+            limit=limit,
+            min_score=min_score
+        )
+    except Exception as e:
+        logger.error(f"Tree search failed: {e}", exc_info=True)
+        raise
+
+    results_by_intent = dict(zip(unique_intents, grouped))
+
+    # Summarize each matched recipe once, count how many nodes matched it
+    recipes: Dict[str, Dict] = {}
+    node_results = []
+    for node in nodes:
+        matches = []
+        for recipe in results_by_intent[node['intent']]:
+            recipe_id = recipe['recipe_id']
+            if recipe_id not in recipes:
+                recipes[recipe_id] = {
+                    "name": recipe['name'],
+                    "description": recipe['description'],
+                    "tags": recipe['tags'],
+                    "node_matches": 0
+                }
+            recipes[recipe_id]["node_matches"] += 1
+            matches.append({"id": recipe_id, "score": recipe['relevance_score']})
+
+        node_results.append({
+            "id": node['id'],
+            "parent_id": node['parent_id'],
+            "intent": node['intent'],
+            "recipes": matches
+        })
+
+    logger.info(f"Tree search found {len(recipes)} unique recipes across {len(nodes)} nodes")
+
+    return {
+        "nodes": node_results,
+        "recipes": recipes,
+        "node_count": len(node_results),
+        "unique_recipe_count": len(recipes)
+    }
@@ -0,0 +1,56 @@
+"""Get recipe option schemas tool backed by structured metadata."""
+import sys
+import logging
+from pathlib import Path
+from typing import Dict
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.queries import get_recipe_option_schemas
+
+logger = logging.getLogger(__name__)
+
+# Option fields returned to agents, in display order
+COMPACT_OPTION_FIELDS = ('name', 'type', 'required', 'example', 'description')
+
+
+async def get_recipe_options(recipe_id: str) -> Dict:
+    """
+    Get the configuration options of a specific OpenRewrite recipe.
+
+    Reads the stored option schemas instead of the full markdown, so agents
+    can fill in a recipe's options without fetching its documentation.
+
+    Args:
+        recipe_id: Unique identifier for the recipe
+
+    Returns:
+        Dictionary with recipe_id, compact option list and required option names
+
+    Raises:
+        ValueError: If recipe_id is not found
+    """
+    logger.info(f"Getting recipe options for: {recipe_id}")
+
+    try:
+        recipe = await get_recipe_option_schemas(recipe_id)
+    except Exception as e:
+        logger.error(f"Database query failed: {e}")
+        raise
+
+    if recipe is None:
+        raise ValueError(
+            f"Recipe '{recipe_id}' not found in database. "
+            "Use find_recipes to search for available recipes."
+        )
+
+    options = [
+        {field: option[field] for field in COMPACT_OPTION_FIELDS if option.get(field) is not None}
+        for option in recipe['options']
+    ]
+
+    return {
+        "recipe_id": recipe['recipe_id'],
+        "options": options,
+        "required_options": [option['name'] for option in options if option.get('required')]
+    }
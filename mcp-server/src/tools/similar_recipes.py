@@ -0,0 +1,62 @@
+"""Similar recipes tool backed by precomputed nearest neighbors."""
+import sys
+import logging
+from pathlib import Path
+from typing import Dict
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import config
+from db.queries import get_similar_recipes
+
+logger = logging.getLogger(__name__)
+
+
+async def similar_recipes(recipe_id: str, limit: int = None) -> Dict:
+    """
+    Find recipes related to a known recipe.
+
+    Uses the recipe_neighbors table precomputed during ingestion, so this is a
+    single indexed lookup with no query encoding or vector scan.
+
+    Args:
+        recipe_id: Unique identifier of the reference recipe
+        limit: Maximum number of related recipes (default: 5)
+
+    Returns:
+        Dictionary with recipe_id and related recipes ordered by similarity
+
+    Raises:
+        ValueError: If recipe_id is not found
+    """
+    if limit is None:
+        limit = config.DEFAULT_RECIPE_LIMIT
+
+    logger.info(f"Getting similar recipes for: {recipe_id} (limit={limit})")
+
+    try:
+        results = await get_similar_recipes(recipe_id, limit)
+    except Exception as e:
+        logger.error(f"Database query failed: {e}")
+        raise
+
+    if results is None:
+        raise ValueError(
+            f"Recipe '{recipe_id}' not found in database. "
+            "Use find_recipes to search for available recipes."
+        )
+
+    return {
+        "recipe_id": recipe_id,
+        "similar_recipes": [
+            {
+                "id": recipe["recipe_id"],
+                "name": recipe["name"],
+                "description": recipe["description"],
+                "tags": recipe["tags"],
+                "score": recipe["similarity"]
+            }
+            for recipe in results
+        ],
+        "total_count": len(results)
+    }
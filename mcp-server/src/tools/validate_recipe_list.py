@@ -0,0 +1,158 @@
+"""Validate recipe names and options referenced by a recipe YAML."""
+import sys
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import yaml
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from db.recipe_index import RecipeIndex, get_recipe_index
+
+logger = logging.getLogger(__name__)
+
+# Keys of a declarative recipe that list recipe references
+RECIPE_LIST_KEYS = ('recipeList', 'preconditions')
+
+
+def extract_recipe_references(documents: List[Any]) -> Tuple[List[str], List[Dict]]:
+    """
+    Collect declared recipe names and referenced recipes from YAML documents.
+
+    recipeList entries are either a bare recipe name or a single-key mapping
+    of recipe name to its options.
+
+    Args:
+        documents: Parsed YAML documents
+
+    Returns:
+        Tuple of (names declared in the YAML, list of references with
+        'recipe', 'options' and 'declared_in' keys)
+    """
+    declared = []
+    references = []
+    for doc in documents:
+        if not isinstance(doc, dict):
+            continue
+        parent = doc.get('name')
+        if isinstance(parent, str):
+            declared.append(parent)
+
+        for key in RECIPE_LIST_KEYS:
+            entries = doc.get(key) or []
+            if not isinstance(entries, list):
+                continue
+            for entry in entries:
+                if isinstance(entry, str):
+                    references.append({'recipe': entry.strip(), 'options': {}, 'declared_in': parent})
+                elif isinstance(entry, dict):
+                    for recipe_name, options in entry.items():
+                        references.append({
+                            'recipe': str(recipe_name).strip(),
+                            'options': options if isinstance(options, dict) else {},
+                            'declared_in': parent
+                        })
+    return declared, references
+
+
+def validate_references(
+    index: RecipeIndex,
+    declared: List[str],
+    references: List[Dict]
+) -> Dict:
+    """
+    Check referenced recipes and option keys against the recipe index.
+
+    Recipes declared in the same YAML are accepted as references, but their
+    options are not checked.
+
+    Returns:
+        Dictionary with unknown recipes, unknown options and missing required options
+    """
+    declared_names = set(declared)
+    unknown_recipes = []
+    unknown_options = []
+    missing_required = []
+    reported = set()
+
+    for ref in references:
+        recipe_name = ref['recipe']
+        if recipe_name in declared_names:
+            continue
+
+        if recipe_name not in index:
+            if recipe_name not in reported:
+                reported.add(recipe_name)
+                unknown_recipes.append({
+                    "recipe": recipe_name,
+                    "declared_in": ref['declared_in'],
+                    "suggestions": index.suggest(recipe_name)
+                })
+            continue
+
+        known_options = index.get_options(recipe_name)
+        for option_name in ref['options']:
+            option_name = str(option_name)
+            if option_name not in known_options:
+                unknown_options.append({
+                    "recipe": recipe_name,
+                    "option": option_name,
+                    "suggestions": RecipeIndex.suggest_option(option_name, list(known_options))
+                })
+
+        missing = [
+            name for name, option in known_options.items()
+            if option.get('required') and name not in ref['options']
+        ]
+        if missing:
+            missing_required.append({"recipe": recipe_name, "options": missing})
+
+    return {
+        "unknown_recipes": unknown_recipes,
+        "unknown_options": unknown_options,
+        "missing_required_options": missing_required
+    }
+
+
+async def validate_recipe_list(yaml_text: str) -> Dict:
+    """
+    Validate every recipe name and option key referenced by a recipe YAML.
+
+    All checks run against the in-memory recipe index, so a whole
+    recommended-recipe.yaml is validated in one call without database access.
+
+    Args:
+        yaml_text: Declarative recipe YAML (may contain several documents)
+
+    Returns:
+        Dictionary with 'valid' flag and all problems found, each unknown
+        name with nearest-name suggestions
+
+    Raises:
+        ValueError: If the YAML cannot be parsed or references no recipes
+    """
+    try:
+        documents = list(yaml.safe_load_all(yaml_text))
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML: {e}")
+
+    declared, references = extract_recipe_references(documents)
+    if not references:
+        raise ValueError("YAML contains no recipeList entries")
+
+    index = get_recipe_index()
+    problems = validate_references(index, declared, references)
+
+    logger.info(
+        f"Validated {len(references)} recipe references: "
+        f"{len(problems['unknown_recipes'])} unknown recipes, "
+        f"{len(problems['unknown_options'])} unknown options"
+    )
+
+    return {
+        "valid": not any(problems.values()),
+        "recipe_count": len(references),
+        "declared_recipes": declared,
+        **problems
+    }
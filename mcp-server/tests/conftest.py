@@ -0,0 +1,18 @@
+"""Test setup: import server modules from src/ with placeholder settings."""
+import os
+import sys
+from pathlib import Path
+
+# config.py requires the database and model settings at import time
+for name, value in {
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "openrewrite_recipes",
+    "DB_USER": "mcp_user",
+    "DB_PASSWORD": "changeme",
+    "EMBEDDING_MODEL": "all-MiniLM-L6-v2",
+    "EMBEDDING_DIMENSION": "384",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
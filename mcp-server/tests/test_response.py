@@ -0,0 +1,73 @@
+"""Response shaping combined with session deduplication."""
+import json
+
+from cache.session_tracker import SessionTracker
+from response import EXPAND_MARKER, shape_response
+
+
+def recipes_response(count: int = 6) -> dict:
+    """A find_recipes style response with long descriptions."""
+    return {
+        "recipes": [
+            {
+                "id": f"org.example.Recipe{i}",
+                "name": f"Recipe {i}",
+                "description": f"Recipe {i} changes things. " + "x" * 300,
+                "tags": ["java"],
+                "score": 0.9 - i / 100
+            }
+            for i in range(count)
+        ],
+        "total_count": count
+    }
+
+
+def test_dropped_and_truncated_summaries_are_resent():
+    session = SessionTracker()
+
+    first = json.loads(shape_response(
+        recipes_response(), max_bytes=500, fields=["name", "description"], session=session
+    ))
+    assert first["truncated"] is True
+    kept = {entry["id"] for entry in first["recipes"]}
+    assert 0 < len(kept) < 6
+    assert all(entry["description"].endswith(EXPAND_MARKER) for entry in first["recipes"])
+
+    # Nothing of the first response was delivered in full: no entry is a stub
+    second = json.loads(shape_response(recipes_response(), fields=["name", "description"], session=session))
+    assert len(second["recipes"]) == 6
+    for entry in second["recipes"]:
+        assert "seen" not in entry
+        assert entry["name"] and not entry["description"].endswith(EXPAND_MARKER)
+
+    # Now the selected fields were delivered in full
+    third = json.loads(shape_response(recipes_response(), fields=["name", "description"], session=session))
+    assert all(entry.get("seen") and "name" not in entry for entry in third["recipes"])
+
+    # Tags were never selected, so the full summary is sent again
+    fourth = json.loads(shape_response(recipes_response(), session=session))
+    assert all("seen" not in entry and entry["tags"] == ["java"] for entry in fourth["recipes"])
+
+
+def test_force_full_records_delivery():
+    session = SessionTracker()
+
+    shape_response(recipes_response(2), session=session, force_full=True)
+    repeat = json.loads(shape_response(recipes_response(2), session=session, force_full=True))
+    assert all("seen" not in entry for entry in repeat["recipes"])
+
+    shortened = json.loads(shape_response(recipes_response(2), session=session))
+    assert all(entry["seen"] for entry in shortened["recipes"])
+
+
+def test_truncated_document_is_not_recorded_as_delivered():
+    session = SessionTracker()
+    document = "# Recipe\n\n" + "documentation " * 200
+    response = {"recipe_id": "org.example.Recipe", "markdown_documentation": document}
+
+    shaped = json.loads(shape_response(dict(response), max_bytes=400, session=session))
+    assert shaped["markdown_documentation"].endswith(EXPAND_MARKER)
+    assert not session.was_delivered("document", "org.example.Recipe", {"markdown_documentation": document})
+
+    shape_response(dict(response), session=session)
+    assert session.was_delivered("document", "org.example.Recipe", {"markdown_documentation": document})